@@ -0,0 +1,278 @@
+"""
+Animation frame cache for the bullet games.
+
+Every frame of an animation, from a multi-frame file such as images/bird.gif or from a list of
+single-frame files such as the robot walk cycle, is decoded once and scaled to the size it is
+drawn at. The frames are packed side by side into one strip image, with a second row holding
+the mirrored frames for sprites facing left.
+
+The strip is cut into one arcade texture per frame and direction, and the strips are cached by
+file and scale, so every sprite with the same animation shares the same few textures and only
+has to remember which frame it shows. A flock of thousands of birds costs no texture memory per bird.
+
+AnimationStates keeps which frame every sprite of a group shows in integer arrays and advances
+them all at once with NumPy, touching only the sprites whose frame changed and, with camera
+culling, only the ones that can be seen. Sprites start at random points of the animation,
+so about the same number of them change frame on every update instead of the whole group at
+once, and the new textures of a sprite list are written into its texture buffer in one array
+copy. Sprites of one group may show different variants of an animation, such as the same frames
+at another size for every bird species.
+
+Required libraries to run are: arcade, numpy and PIL
+Requires ecs.py and spritelists.py
+"""
+
+# IMPORT LIBRARIES
+import arcade
+import numpy as np
+from PIL import Image, ImageOps, ImageSequence
+from arcade.resources import resolve_resource_path
+from ecs import compact, swap_remove
+from spritelists import write_sprite_textures
+
+# ROWS OF THE STRIP, IN THE SAME ORDER AS game_core.RIGHT_FACING AND game_core.LEFT_FACING
+DIRECTIONS = 2
+
+# DECODED ANIMATIONS BY (NAME, SCALE)
+animation_cache = {}
+
+
+def animation_name(source):
+    """
+    Returns the name an animation is cached under.
+
+    :param source: A multi-frame image file, or a list of single-frame image files.
+    """
+    if isinstance(source, (list, tuple)):
+        return "|".join(map(str, source))
+    return str(source)
+
+
+def decode_frames(source):
+    """
+    Decode every frame of an animation to RGBA images.
+
+    :param source: A multi-frame image file, or a list of single-frame image files.
+    """
+    if isinstance(source, (list, tuple)):
+        return [frame for file_name in source for frame in decode_frames(file_name)]
+
+    with Image.open(resolve_resource_path(source)) as image:
+        return [frame.convert("RGBA") for frame in ImageSequence.Iterator(image)]
+
+
+def decode_strip(source, scale=1.0):
+    """
+    Decode an animation into a strip image: one column per frame, the top row as drawn
+    and the bottom row mirrored. Safe to call from a worker thread.
+
+    :param source: A multi-frame image file, or a list of single-frame image files.
+    :param scale: Size the frames are stored at, compared to the files.
+    :return: The strip image and the number of frames in it.
+    """
+    frames = decode_frames(source)
+    width, height = frames[0].size
+    width, height = max(round(width * scale), 1), max(round(height * scale), 1)
+
+    strip = Image.new("RGBA", (width * len(frames), height * DIRECTIONS))
+    for index, frame in enumerate(frames):
+        # BOX AVERAGES EVERY SOURCE PIXEL, SHARP ENOUGH FOR BIG REDUCTIONS AND SEVERAL TIMES FASTER THAN LANCZOS
+        frame = frame.resize((width, height), Image.Resampling.BOX) if frame.size != (width, height) else frame
+        strip.paste(frame, (index * width, 0))
+        strip.paste(ImageOps.mirror(frame), (index * width, height))
+    return strip, len(frames)
+
+
+class AnimationStrip:
+    """
+    The frames of one animation, as arcade textures shared by every sprite using it.
+
+    :param name: Name of the animation, used to name its textures.
+    :param strip: Strip image made by decode_strip.
+    :param frame_count: Number of frames in the strip.
+    """
+
+    def __init__(self, name, strip, frame_count):
+        """
+        Initialize object.
+        """
+        self.name = name
+        self.strip = strip
+        self.frame_count = frame_count
+        self.frame_width = strip.width // frame_count
+        self.frame_height = strip.height // DIRECTIONS
+
+        # textures[direction][frame], THE BOXES OF THE FRAMES ARE THEIR HIT BOXES
+        self.textures = [[self._cut(frame, direction) for frame in range(frame_count)]
+                         for direction in range(DIRECTIONS)]
+
+    def __len__(self):
+        return self.frame_count
+
+    def texture(self, frame, direction=0):
+        """
+        Returns the texture of a frame.
+
+        :param frame: Index of the frame, wrapping around at the end of the animation.
+        :param direction: 0 for the frames as drawn, 1 for the mirrored frames.
+        """
+        return self.textures[direction][frame % self.frame_count]
+
+    def _cut(self, frame, direction):
+        """
+        Cut one frame out of the strip as a texture.
+
+        :param frame: Index of the frame.
+        :param direction: Row of the strip.
+        """
+        left = frame * self.frame_width
+        top = direction * self.frame_height
+        image = self.strip.crop((left, top, left + self.frame_width, top + self.frame_height))
+        return arcade.Texture(f"{self.name}-{self.frame_width}x{self.frame_height}-frame{frame}-direction{direction}",
+                              image, hit_box_algorithm="None")
+
+
+def load_animation(source, scale=1.0, decoded=None):
+    """
+    Returns the cached animation of a source, decoding it the first time.
+
+    :param source: A multi-frame image file, or a list of single-frame image files.
+    :param scale: Size the frames are stored at, compared to the files.
+    :param decoded: The (strip, frame count) from decode_strip if it was already decoded,
+                    for example on a worker thread.
+    """
+    key = (animation_name(source), scale)
+    if key not in animation_cache:
+        strip, frame_count = decoded if decoded is not None else decode_strip(source, scale)
+        animation_cache[key] = AnimationStrip(key[0], strip, frame_count)
+    return animation_cache[key]
+
+
+class AnimationStates:
+    """
+    Animation state of a group of sprites, such as the birds, kept in arrays in the same order as the sprites.
+
+    Every update, sprites moving left face left and sprites moving right face right. Moving sprites
+    advance their frame counter and show a new walking frame every updates_per_frame updates.
+    Sprites standing still show the idle frame, or keep their walking frame if there is none.
+
+    :param animation: AnimationStrip of the frames shown while moving, or a list of them with the
+        same number of frames, one per variant.
+    :param AnimationStrip idle_animation: Frame shown while standing still, or None.
+    :param updates_per_frame: Number of updates each frame is shown for.
+    :param count: Number of sprites to start with.
+    :param variants: Variant of the starting sprites, one for all or one per sprite.
+    """
+
+    def __init__(self, animation, idle_animation=None, updates_per_frame=5, count=0, variants=0):
+        """
+        Initialize object.
+        """
+        strips = list(animation) if isinstance(animation, (list, tuple)) else [animation]
+        if any(len(strip) != len(strips[0]) for strip in strips):
+            raise ValueError(f"Got variants with {[len(strip) for strip in strips]} frames, but they must match.")
+        self.animation = strips[0]
+        self.idle_animation = idle_animation
+        self.updates_per_frame = updates_per_frame
+
+        # EVERY TEXTURE A SPRITE CAN SHOW, ONE BLOCK PER VARIANT, THE ARRAYS BELOW HOLD INDICES INTO IT
+        frames = len(self.animation)
+        self.textures = []
+        for strip in strips:
+            self.textures += strip.textures[0] + strip.textures[1]
+            if idle_animation is not None:
+                self.textures += [idle_animation.texture(0, 0), idle_animation.texture(0, 1)]
+        self.idle_index = 2 * frames
+        self.block_size = len(self.textures) // len(strips)
+
+        # counters COUNT UPDATES SPENT MOVING, STARTING AT RANDOM PHASES, wanted IS THE TEXTURE A SPRITE
+        # SHOULD SHOW, shown IS THE TEXTURE ON THE SPRITE (-1 FOR NONE YET)
+        self.counters = self.start_counters(count)
+        self.directions = np.zeros(count, dtype=np.int64)
+        self.wanted = np.zeros(count, dtype=np.int64)
+        self.shown = np.full(count, -1, dtype=np.int64)
+        self.variants = np.broadcast_to(np.asarray(variants, dtype=np.int64), (count,)).copy()
+
+    def __len__(self):
+        return len(self.counters)
+
+    def spawn(self, count, variants=0):
+        """
+        Add sprites to the end of the arrays, facing right at a random point of the animation.
+
+        :param count: How many sprites to add.
+        :param variants: Variant of the new sprites, one for all or one per sprite.
+        """
+        self.variants = np.concatenate([self.variants, np.broadcast_to(np.asarray(variants, dtype=np.int64),
+                                                                       (count,))])
+        self.counters = np.concatenate([self.counters, self.start_counters(count)])
+        self.directions = np.concatenate([self.directions, np.zeros(count, dtype=np.int64)])
+        self.wanted = np.concatenate([self.wanted, np.zeros(count, dtype=np.int64)])
+        self.shown = np.concatenate([self.shown, np.full(count, -1, dtype=np.int64)])
+
+    def start_counters(self, count):
+        """
+        Returns random starting frame counters, so sprites made together do not all change frame on the same update.
+
+        :param count: How many counters to make.
+        """
+        return np.random.randint(0, len(self.animation) * self.updates_per_frame, count).astype(np.int64)
+
+    def kill(self, indices):
+        """
+        Remove sprites. The last sprites move into the gaps, see ecs.swap_remove.
+
+        :param indices: Index or indices of the sprites to remove.
+        """
+        plan = swap_remove(len(self.counters), indices)
+        self.counters = compact(self.counters, *plan)
+        self.directions = compact(self.directions, *plan)
+        self.wanted = compact(self.wanted, *plan)
+        self.shown = compact(self.shown, *plan)
+        self.variants = compact(self.variants, *plan)
+
+    def update(self, velocities):
+        """
+        Advance every sprite by one update.
+
+        :param velocities: (2, N) array of the sprite velocities.
+        :return: Indices of the sprites whose texture has to change. They keep their old
+                 texture until they are passed to apply.
+        """
+        change_x, change_y = velocities
+
+        # FLIP IMAGE BASED ON FACING DIRECTION, KEEP IT WHEN NOT MOVING SIDEWAYS
+        self.directions[change_x < 0] = 1
+        self.directions[change_x > 0] = 0
+
+        # ADVANCE THE FRAME COUNTER OF EVERY MOVING SPRITE
+        moving = (change_x != 0) | (change_y != 0)
+        self.counters[moving] += 1
+        self.counters %= len(self.animation) * self.updates_per_frame
+
+        # PICK THE TEXTURE: [RIGHT FRAMES, LEFT FRAMES, IDLE RIGHT, IDLE LEFT]
+        self.wanted = self.directions * len(self.animation) + self.counters // self.updates_per_frame
+        if self.idle_animation is not None:
+            self.wanted = np.where(moving, self.wanted, self.idle_index + self.directions)
+        self.wanted += self.variants * self.block_size
+        return np.flatnonzero(self.wanted != self.shown)
+
+    def apply(self, sprites, changed):
+        """
+        Put the new textures on sprites that changed frame. In a sprite list, sprites that already
+        showed a texture get the new one written into the list's texture buffer, in one array copy
+        (see spritelists.write_sprite_textures), and their own texture attribute is left as it was:
+        shown holds the index into textures of what every sprite shows.
+
+        :param sprites: The sprites, in the same order as the arrays.
+        :param changed: Indices returned by update, or only the visible ones among them.
+        """
+        changed = np.asarray(changed, dtype=np.int64)
+        previous = self.shown[changed]
+        self.shown[changed] = self.wanted[changed]
+
+        # SPRITES SHOWING THEIR FIRST TEXTURE GO THROUGH THE SETTER, WHICH ALSO SETS THEIR SIZE
+        bulk = previous >= 0 if isinstance(sprites, arcade.SpriteList) else np.zeros(len(changed), dtype=bool)
+        for index in changed[~bulk]:
+            sprites[index].texture = self.textures[self.shown[index]]
+        write_sprite_textures(sprites, changed[bulk], self.textures, self.shown[changed[bulk]], previous[bulk])
@@ -0,0 +1,224 @@
+"""
+Background asset loading for the bullet games.
+
+Image files are decoded and the tile map is parsed on a pool of worker threads while the
+main thread keeps drawing the loading screen. Pillow releases the GIL while it decodes,
+so several images decode at the same time on a multi-core machine. Animations are decoded into
+their frame strips (see animation.py) on the workers as well.
+
+The decoded images are handed to arcade on the main thread by putting them into
+arcade's texture cache, under the same name arcade.load_texture would use. Every later
+arcade.load_texture, arcade.Sprite or TileMap call for that file then reuses the decoded
+image instead of reading the file again. Textures still reach the GPU on the main thread,
+the first time a sprite list using them is drawn.
+
+Required libraries to run are: concurrent.futures, os, pathlib, threading, arcade, pytiled_parser and PIL
+Requires animation.py
+"""
+
+# IMPORT LIBRARIES
+import os
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import arcade
+import pytiled_parser
+from PIL import Image
+from arcade.resources import resolve_resource_path
+from animation import animation_name, decode_strip, load_animation
+
+
+def decode_image(file_name):
+    """
+    Read and decode an image file the way arcade.load_texture does. Safe to call from a worker thread.
+
+    :param file_name: Path of the image, ":resources:" paths included.
+    :return: The decoded RGBA image.
+    """
+    with Image.open(resolve_resource_path(file_name)) as image:
+        return image.convert("RGBA")
+
+
+def map_image_path(tiled_map, image):
+    """
+    Returns the file name of an image used by a parsed tile map, named the way arcade's TileMap asks for it:
+    as written if that file exists, otherwise next to the map file.
+
+    :param pytiled_parser.TiledMap tiled_map: The parsed map.
+    :param image: Path of the image as written in the map.
+    """
+    if os.path.exists(image):
+        return str(image)
+    return str(Path(os.path.dirname(tiled_map.map_file), image))
+
+
+def tileset_images(tiled_map):
+    """
+    Returns the image files of a parsed tile map, named the way arcade's TileMap will ask for them.
+
+    :param pytiled_parser.TiledMap tiled_map: The parsed map.
+    """
+    images = []
+    for tileset in tiled_map.tilesets.values():
+        sources = [tileset.image] + [tile.image for tile in (tileset.tiles or {}).values()]
+        images += [map_image_path(tiled_map, image) for image in sources if image is not None]
+    return images
+
+
+class AssetLoader:
+    """
+    Decodes images and parses tile maps on worker threads.
+
+    Every submitted file has a future holding its decoded image. install() waits for an image
+    and gives it to arcade, and must be called from the main thread.
+
+    :param max_workers: Number of worker threads, None lets the executor choose.
+    :param on_progress: Optional function called with (done, total) every time a file finishes.
+                        It is called from a worker thread, so it should only store the numbers.
+    """
+
+    def __init__(self, max_workers=None, on_progress=None):
+        """
+        Initialize object.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="assets")
+        self.on_progress = on_progress
+        self.futures = {}
+        self.finished = 0
+        self._lock = threading.RLock()
+
+    @property
+    def total(self):
+        """Returns how many files were submitted."""
+        return len(self.futures)
+
+    @property
+    def done(self):
+        """Returns whether every submitted file has finished loading."""
+        return self.finished >= self.total
+
+    @property
+    def progress(self):
+        """Returns the fraction of submitted files that have finished loading."""
+        return self.finished / max(self.total, 1)
+
+    def submit(self, file_name):
+        """
+        Start decoding an image, unless it was submitted before or arcade already has it.
+
+        :param file_name: Path of the image, exactly as it will be passed to arcade.
+        :return: The future of the decoded image, or None if arcade already has it.
+        """
+        file_name = str(file_name)
+        if file_name in arcade.load_texture.texture_cache:
+            return None
+        return self._submit(file_name, decode_image, file_name)
+
+    def submit_many(self, file_names):
+        """
+        Start decoding several images.
+
+        :param file_names: Paths of the images.
+        """
+        for file_name in file_names:
+            self.submit(file_name)
+
+    def submit_map(self, map_file):
+        """
+        Start parsing a Tiled map. Once it is parsed its tileset images start decoding as well.
+
+        :param map_file: Path of the .tmj map.
+        :return: The future of the parsed pytiled_parser.TiledMap.
+        """
+        return self._submit(str(map_file), self._parse_map, map_file)
+
+    def submit_animation(self, source, scale=1.0):
+        """
+        Start decoding every frame of an animation into its strip.
+
+        :param source: A multi-frame image file, or a list of single-frame image files.
+        :param scale: Size the frames are stored at, compared to the files.
+        :return: The future of the decoded (strip, frame count).
+        """
+        return self._submit(self._animation_key(source, scale), decode_strip, source, scale)
+
+    def result(self, name):
+        """
+        Wait for a submitted file and return what it loaded to.
+
+        :param name: Path the file was submitted with.
+        """
+        return self.futures[str(name)].result()
+
+    def install(self, file_names):
+        """
+        Wait for images to decode and hand them to arcade. Must run on the main thread.
+        Files that were never submitted are left for arcade to load itself.
+
+        :param file_names: Paths of the images, exactly as they will be passed to arcade.
+        """
+        cache = arcade.load_texture.texture_cache
+        for file_name in map(str, file_names):
+            if file_name in cache or file_name not in self.futures:
+                continue
+            cache[file_name] = arcade.Texture(file_name, self.futures[file_name].result(),
+                                              hit_box_algorithm="None")
+
+    def install_animation(self, source, scale=1.0):
+        """
+        Wait for an animation to decode and return it from the animation cache. Must run on the main thread.
+        Animations that were never submitted are decoded here.
+
+        :param source: A multi-frame image file, or a list of single-frame image files.
+        :param scale: Size the frames are stored at, compared to the files.
+        """
+        future = self.futures.get(self._animation_key(source, scale))
+        return load_animation(source, scale, future.result() if future is not None else None)
+
+    def shutdown(self):
+        """
+        Stop the worker threads once the running files are done. Files not started yet are dropped.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _parse_map(self, map_file):
+        """
+        Parse a map on a worker thread and queue its tileset images.
+
+        :param map_file: Path of the .tmj map.
+        """
+        tiled_map = pytiled_parser.parse_map(resolve_resource_path(map_file))
+        self.submit_many(tileset_images(tiled_map))
+        return tiled_map
+
+    @staticmethod
+    def _animation_key(source, scale):
+        """
+        Returns the name the future of an animation is stored under.
+        """
+        return f"animation:{animation_name(source)}@{scale}"
+
+    def _submit(self, name, function, *args):
+        """
+        Run a loading function on the pool under a name, unless that name was submitted before.
+
+        :param name: Name to find the future by later.
+        :param function: Loading function to run.
+        """
+        with self._lock:
+            if name not in self.futures:
+                self.futures[name] = self.executor.submit(function, *args)
+                self.futures[name].add_done_callback(self._finished)
+            return self.futures[name]
+
+    def _finished(self, future):
+        """
+        Count a finished file and report the progress.
+
+        :param future: The future that finished.
+        """
+        with self._lock:
+            self.finished += 1
+            done, total = self.finished, self.total
+        if self.on_progress is not None:
+            self.on_progress(done, total)
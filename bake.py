@@ -0,0 +1,133 @@
+"""
+Pre-rendered background chunks for the bullet games.
+
+The map layers never change while playing, so each chunk of tiles is drawn once into an
+offscreen framebuffer and from then on the whole chunk, every layer of it, is drawn as a
+single textured quad. This turns hundreds of tile sprites per screen into a few quads.
+
+The framebuffer keeps premultiplied alpha so see-through tiles blend the same as when they
+are drawn one by one. Works under a software OpenGL context such as llvmpipe, set
+ARCADE_HEADLESS=1 to try it without a display.
+
+Required libraries to run are: arcade
+"""
+
+# IMPORT LIBRARIES
+from arcade.gl import geometry
+
+# DRAWS A BAKED CHUNK TEXTURE AS ONE QUAD IN WORLD SPACE
+BAKED_VERTEX_SHADER = """
+#version 330
+
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+
+in vec2 in_vert;
+in vec2 in_uv;
+
+out vec2 v_uv;
+
+void main() {
+    v_uv = in_uv;
+    gl_Position = proj.matrix * vec4(in_vert, 0.0, 1.0);
+}
+"""
+
+BAKED_FRAGMENT_SHADER = """
+#version 330
+
+uniform sampler2D chunk;
+
+in vec2 v_uv;
+
+out vec4 f_color;
+
+void main() {
+    f_color = texture(chunk, v_uv);
+}
+"""
+
+
+class BakedChunk:
+    """
+    One chunk of the background rendered into a texture.
+
+    :param texture: The arcade.gl texture holding the chunk.
+    :param quad: The geometry covering the chunk in the world.
+    """
+
+    def __init__(self, texture, quad):
+        """
+        Initialize object.
+        """
+        self.texture = texture
+        self.quad = quad
+
+    def release(self):
+        """
+        Free the texture now instead of waiting for garbage collection.
+        """
+        self.texture.delete()
+
+
+class ChunkBaker:
+    """
+    Renders chunks of tile sprites into textures and draws them back.
+
+    :param ctx: The arcade context of the window.
+    """
+
+    def __init__(self, ctx):
+        """
+        Initialize object.
+        """
+        self.ctx = ctx
+        self.program = ctx.program(vertex_shader=BAKED_VERTEX_SHADER, fragment_shader=BAKED_FRAGMENT_SHADER)
+        self.program["chunk"] = 0
+
+        # COLOR AS USUAL, ALPHA ADDED UP, SO THE TEXTURE ENDS UP WITH PREMULTIPLIED ALPHA
+        self.bake_blend = (ctx.SRC_ALPHA, ctx.ONE_MINUS_SRC_ALPHA, ctx.ONE, ctx.ONE_MINUS_SRC_ALPHA)
+        self.draw_blend = (ctx.ONE, ctx.ONE_MINUS_SRC_ALPHA)
+
+    def bake(self, sprite_lists, rect):
+        """
+        Render sprite lists, in order, into a new texture covering a part of the world.
+
+        :param sprite_lists: The sprite lists of the chunk, bottom layer first.
+        :param rect: The (left, right, bottom, top) of the chunk in the world.
+        :return: The BakedChunk.
+        """
+        left, right, bottom, top = rect
+        size = (round(right - left), round(top - bottom))
+        texture = self.ctx.texture(size, components=4, filter=(self.ctx.NEAREST, self.ctx.NEAREST))
+        framebuffer = self.ctx.framebuffer(color_attachments=[texture])
+
+        # DRAW THE CHUNK WITH A PROJECTION COVERING ONLY IT, THEN PUT THE PROJECTION BACK
+        projection, matrix = self.ctx.projection_2d, self.ctx.projection_2d_matrix
+        with framebuffer.activate():
+            framebuffer.clear()
+            self.ctx.projection_2d = (left, right, bottom, top)
+            for sprite_list in sprite_lists:
+                if len(sprite_list) > 0:
+                    sprite_list.draw(blend_function=self.bake_blend)
+        self.ctx.projection_2d = projection
+        self.ctx.projection_2d_matrix = matrix
+        self.ctx.blend_func = self.ctx.BLEND_DEFAULT
+        framebuffer.delete()
+
+        quad = geometry.quad_2d(size=(right - left, top - bottom), pos=((left + right) / 2, (bottom + top) / 2))
+        return BakedChunk(texture, quad)
+
+    def draw(self, chunks):
+        """
+        Draw baked chunks with the current projection.
+
+        :param chunks: The BakedChunks to draw.
+        """
+        self.ctx.enable(self.ctx.BLEND)
+        self.ctx.blend_func = self.draw_blend
+        for chunk in chunks:
+            chunk.texture.use(0)
+            chunk.quad.render(self.program)
+        self.ctx.blend_func = self.ctx.BLEND_DEFAULT
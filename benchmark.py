@@ -0,0 +1,491 @@
+"""
+Benchmarks for the hot paths of the bullet games.
+
+Run every benchmark with:
+python benchmark.py
+or only some of them with:
+python benchmark.py bars
+
+Set ARCADE_HEADLESS=1 to run the drawing benchmarks without a display.
+Required libraries to run are: time, argparse, pathlib, arcade, numpy and pytiled_parser
+"""
+
+# IMPORT LIBRARIES
+import argparse
+import time
+from pathlib import Path
+import arcade
+import numpy as np
+import pytiled_parser
+import kernels
+from animation import AnimationStates, load_animation
+from bake import ChunkBaker
+import flock
+from flock import Flock
+from healthbar import IndicatorBars
+from hud import Hud
+from spritelists import swap_remove_sprites, write_sprite_data
+from vecenv import ACTION_KEYS, BoidsVecEnv
+from world import MapTiles, TileWorld
+
+# SET BENCHMARK VALUES
+FRAME_BUDGET = 1 / 60
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+PARITY_TOLERANCE = 1e-9  # LARGEST RELATIVE AND ABSOLUTE DIFFERENCE BETWEEN TWO KERNEL VERSIONS
+FLAT_COST_RATIO = 1.5  # MOST THE TIME PER BIRD MAY GROW ACROSS FLOCK SIZES BEFORE THE COST IS NOT LINEAR
+
+window = None
+
+
+def get_window():
+    """
+    Returns a hidden window to draw into, created the first time it is needed.
+    """
+    global window
+    if window is None:
+        window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, "Benchmark", visible=False)
+    return window
+
+
+def report(name, frame_times):
+    """
+    Print the mean and worst frame time of a benchmark against the 60 Hz frame budget.
+
+    :param name: Name of the benchmark.
+    :param frame_times: Seconds spent on each frame.
+    """
+    frame_times = np.asarray(frame_times)
+    mean = frame_times.mean()
+    print(f"{name:<40} mean {mean * 1000:8.3f} ms   "
+          f"p99 {np.percentile(frame_times, 99) * 1000:8.3f} ms   "
+          f"{mean / FRAME_BUDGET:6.1%} of the 60 Hz budget")
+
+
+def bench_bars(count=5000, frames=600):
+    """
+    Move every bar and damage a few of them each frame, then draw them all, at 60 Hz.
+
+    :param count: Number of bars.
+    :param frames: Number of frames to run.
+    """
+    ctx = get_window().ctx
+    rng = np.random.default_rng(0)
+    bars = IndicatorBars(arcade.color.RED, width=24, height=2, border_size=2, capacity=count)
+    positions = rng.random((2, count)) * [[SCREEN_WIDTH], [SCREEN_HEIGHT]]
+    velocities = rng.normal(0, 1, (2, count))
+    health = np.ones(count)
+    slots = bars.add_many(positions)
+
+    update_times = []
+    draw_times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+
+        # EVERY BAR FOLLOWS ITS MOVING OWNER, A FEW OWNERS GET HIT
+        positions += velocities
+        bars.set_positions(slots, positions)
+        hit = rng.integers(0, count, 20)
+        health[hit] = np.maximum(health[hit] - 0.1, 0)
+        bars.set_fullness(slots[hit], health[hit])
+        updated = time.perf_counter()
+
+        ctx.screen.use()
+        ctx.screen.clear()
+        bars.draw()
+        ctx.finish()
+        update_times.append(updated - start)
+        draw_times.append(time.perf_counter() - updated)
+
+    report(f"bars update ({count} at 60 Hz)", update_times)
+    report(f"bars upload + draw ({count} at 60 Hz)", draw_times)
+
+
+def bench_animation(count=5000, frames=120):
+    """
+    Animate a flock of birds that keep turning around, then draw them, at 60 Hz.
+
+    :param count: Number of birds.
+    :param frames: Number of frames to run.
+    """
+    ctx = get_window().ctx
+    rng = np.random.default_rng(0)
+    animation = load_animation("images/bird.gif", 0.02)
+    states = AnimationStates(animation, updates_per_frame=6, count=count)
+    birds = arcade.SpriteList()
+    for x, y in rng.random((count, 2)) * [SCREEN_WIDTH, SCREEN_HEIGHT]:
+        birds.append(arcade.Sprite(texture=animation.texture(0), center_x=x, center_y=y))
+    velocities = rng.normal(0, 1, (2, count))
+
+    update_times = []
+    draw_times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+
+        # A FEW BIRDS TURN AROUND EVERY FRAME
+        turning = rng.integers(0, count, 20)
+        velocities[0, turning] *= -1
+        states.apply(birds, states.update(velocities))
+        updated = time.perf_counter()
+
+        ctx.screen.use()
+        ctx.screen.clear()
+        birds.draw()
+        ctx.finish()
+        update_times.append(updated - start)
+        draw_times.append(time.perf_counter() - updated)
+
+    report(f"animation update ({count} at 60 Hz)", update_times)
+    report(f"animation draw ({count} at 60 Hz)", draw_times)
+
+
+def bench_background(frames=120):
+    """
+    Draw the game map tile by tile and as baked chunks, check both give the same picture,
+    and time each at 60 Hz.
+
+    :param frames: Number of frames to time each way.
+    """
+    ctx = get_window().ctx
+    view = (0, SCREEN_WIDTH, 0, SCREEN_HEIGHT)
+    tiled_map = pytiled_parser.parse_map(Path("maps/map.tmj").resolve())
+    target = ctx.framebuffer(color_attachments=[ctx.texture((SCREEN_WIDTH, SCREEN_HEIGHT), components=4)])
+
+    pictures = {}
+    for name, baker in [("tiles", None), ("baked", ChunkBaker(ctx))]:
+        world = TileWorld(MapTiles(tiled_map), baker=baker)
+        world.update(view)
+
+        draw_times = []
+        for frame in range(frames):
+            start = time.perf_counter()
+            with target.activate():
+                ctx.projection_2d = view
+                target.clear()
+                world.draw(view)
+            ctx.finish()
+            draw_times.append(time.perf_counter() - start)
+
+        pictures[name] = np.frombuffer(target.read(components=4), dtype=np.uint8).astype(int)
+        report(f"background draw ({name})", draw_times)
+
+    difference = np.abs(pictures["tiles"] - pictures["baked"])
+    print(f"{'background baked vs tiles':<40} max channel difference {difference.max()}, "
+          f"{np.count_nonzero(difference)} channels differ")
+
+
+def bench_hud(lines=4, frames=600, score_every=30):
+    """
+    Draw a few lines of HUD text with arcade.draw_text and with the HUD, the score changing now and then,
+    at 60 Hz.
+
+    :param lines: Number of lines of text.
+    :param frames: Number of frames to run each way.
+    :param score_every: Frames between score changes.
+    """
+    ctx = get_window().ctx
+    hud = Hud()
+    for line in range(lines):
+        hud.add(line, f"Line {line}: {{}}", 10, 20 + line * 20, font_size=14, value=0)
+
+    for name in ["draw_text", "hud"]:
+        draw_times = []
+        for frame in range(frames):
+            score = frame // score_every
+            start = time.perf_counter()
+            ctx.screen.use()
+            ctx.screen.clear()
+            for line in range(lines):
+                if name == "hud":
+                    hud[line].set(score)
+                else:
+                    arcade.draw_text(f"Line {line}: {score}", 10, 20 + line * 20, arcade.color.WHITE, 14)
+            if name == "hud":
+                hud.draw()
+            ctx.finish()
+            draw_times.append(time.perf_counter() - start)
+        report(f"hud {name} ({lines} lines at 60 Hz)", draw_times)
+
+
+def bench_kernels(count=2000, frames=60, parity_count=300):
+    """
+    Check the loop kernels give the same results as their NumPy versions, then time both at 60 Hz.
+    A kernel pair that differs by more than PARITY_TOLERANCE stops the run with an AssertionError.
+    Without Numba the loops run as plain Python, so only the parity check runs for them.
+
+    :param count: Number of birds to time with.
+    :param frames: Number of frames to time each kernel.
+    :param parity_count: Number of birds to check parity with.
+    """
+    rng = np.random.default_rng(0)
+    loops = {
+        "neighbor_sums": kernels.neighbor_sums if kernels.NUMBA else kernels.neighbor_sums_loops,
+        "neighbor_offsets": kernels.neighbor_offsets if kernels.NUMBA else kernels.neighbor_offsets_loops,
+        "follow_step": kernels.follow_step if kernels.NUMBA else kernels.follow_step_loops,
+        "wall_pushes": kernels.wall_pushes if kernels.NUMBA else kernels.wall_pushes_loops,
+    }
+    numpy = {
+        "neighbor_sums": kernels.neighbor_sums_numpy,
+        "neighbor_offsets": kernels.neighbor_offsets_numpy,
+        "follow_step": kernels.follow_step_numpy,
+        "wall_pushes": kernels.wall_pushes_numpy,
+    }
+
+    def arguments(name, birds):
+        positions = rng.random((2, birds)) * [[SCREEN_WIDTH], [SCREEN_HEIGHT]]
+        velocities = rng.normal(0, 1, (2, birds))
+        if name == "neighbor_sums":
+            return positions, velocities, 100.0, rng.integers(0, 2, birds), np.array([SCREEN_WIDTH, 0.0])
+        if name == "neighbor_offsets":
+            return positions, 100.0, np.array([SCREEN_WIDTH, SCREEN_HEIGHT], dtype=float)
+        if name == "follow_step":
+            return positions, SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, 1.5
+        walls = rng.random((2, 8)) * [[SCREEN_WIDTH], [SCREEN_HEIGHT]]
+        return positions, velocities, np.full((2, birds), 4.0), walls, np.full((2, 8), 40.0), 20.0
+
+    print(f"kernels backend: {kernels.BACKEND}")
+    for name in loops:
+        # SAME INPUTS, COPIED SINCE follow_step MOVES THE POSITIONS IN PLACE
+        given = arguments(name, parity_count)
+        expected = numpy[name](*[np.copy(value) for value in given])
+        got = loops[name](*[np.copy(value) for value in given])
+        expected, got = (expected, got) if isinstance(expected, tuple) else ((expected,), (got,))
+        for output, (want, have) in enumerate(zip(expected, got)):
+            np.testing.assert_allclose(have, want, rtol=PARITY_TOLERANCE, atol=PARITY_TOLERANCE,
+                                       err_msg=f"{name} loops differ from numpy in output {output}")
+        difference = max(np.max(np.abs(np.asarray(a, dtype=float) - np.asarray(b, dtype=float)), initial=0)
+                         for a, b in zip(expected, got))
+        print(f"{name + ' loops vs numpy':<40} max difference {difference:.3g}")
+
+        given = arguments(name, count)
+        backends = {"numpy": numpy[name]}
+        if kernels.NUMBA:
+            backends["numba"] = loops[name]
+        for backend, kernel in backends.items():
+            kernel(*[np.copy(value) for value in given])  # COMPILE OR LOAD FROM THE DISK CACHE FIRST
+            frame_times = []
+            for frame in range(frames):
+                start = time.perf_counter()
+                kernel(*given)
+                frame_times.append(time.perf_counter() - start)
+            report(f"{name} {backend} ({count} birds)", frame_times)
+
+
+def bench_kills(count=5000, kills=500, rounds=10):
+    """
+    Remove many sprites from a big sprite list at once, one at a time with arcade and in one swap-remove pass.
+
+    :param count: Number of sprites in the list.
+    :param kills: Number of sprites removed at once, like a bullet sweeping through a dense flock.
+    :param rounds: Number of times to time each way.
+    """
+    get_window()
+    rng = np.random.default_rng(0)
+    texture = arcade.make_soft_square_texture(8, arcade.color.WHITE)
+    for name in ["one at a time", "swap-remove"]:
+        kill_times = []
+        for _ in range(rounds):
+            sprites = arcade.SpriteList()
+            for x, y in rng.random((count, 2)) * [SCREEN_WIDTH, SCREEN_HEIGHT]:
+                sprites.append(arcade.Sprite(texture=texture, center_x=x, center_y=y))
+            rows = rng.choice(count, kills, replace=False)
+
+            start = time.perf_counter()
+            if name == "swap-remove":
+                swap_remove_sprites(sprites, rows)
+            else:
+                for sprite in [sprites[row] for row in rows]:
+                    sprite.remove_from_sprite_lists()
+            kill_times.append(time.perf_counter() - start)
+        report(f"kill {kills} of {count} ({name})", kill_times)
+
+
+def bench_sync(count=5000, frames=120):
+    """
+    Copy simulated positions onto a big sprite list each frame, one sprite at a time and in one
+    buffer write, check both leave the same buffer, and time each at 60 Hz.
+
+    :param count: Number of sprites.
+    :param frames: Number of frames to run each way.
+    """
+    get_window()
+    rng = np.random.default_rng(0)
+    texture = arcade.make_soft_square_texture(8, arcade.color.WHITE)
+    positions = rng.random((2, count)) * [[SCREEN_WIDTH], [SCREEN_HEIGHT]]
+    velocities = rng.normal(0, 1, (2, count))
+
+    buffers = {}
+    for name in ["setters", "buffer write"]:
+        sprites = arcade.SpriteList()
+        for x, y in positions.T:
+            sprites.append(arcade.Sprite(texture=texture, center_x=x, center_y=y))
+
+        sync_times = []
+        moved = positions.copy()
+        for frame in range(frames):
+            moved += velocities
+            start = time.perf_counter()
+            if name == "buffer write":
+                write_sprite_data(sprites, moved)
+            else:
+                for sprite, (x, y) in zip(sprites, moved.T):
+                    sprite.center_x, sprite.center_y = x, y
+            sync_times.append(time.perf_counter() - start)
+
+        buffers[name] = np.frombuffer(sprites._sprite_pos_data, dtype=np.float32)[:count * 2].copy()
+        report(f"sync {count} positions ({name})", sync_times)
+
+    difference = np.abs(buffers["setters"] - buffers["buffer write"]).max()
+    print(f"{'sync buffer write vs setters':<40} max position difference {difference}")
+
+
+def bench_vecenv(steps=200, env_counts=(1, 16, 256), bird_count=50):
+    """
+    Step batches of boids games with random actions and report env-steps per second.
+
+    :param steps: Number of steps to run each batch.
+    :param env_counts: Batch sizes to try.
+    :param bird_count: Number of birds in every copy of the game.
+    """
+    rng = np.random.default_rng(0)
+    for num_envs in env_counts:
+        env = BoidsVecEnv(num_envs, bird_count=bird_count, seed=0)
+        step_times = []
+        for step in range(steps):
+            actions = rng.integers(0, len(ACTION_KEYS), num_envs)
+            start = time.perf_counter()
+            env.step(actions)
+            step_times.append(time.perf_counter() - start)
+        report(f"vecenv step ({num_envs} games, {bird_count} birds)", step_times)
+        print(f"{'':<40} {num_envs * steps / np.sum(step_times):,.0f} env-steps per second")
+
+
+def bench_species(counts=(1000, 2000, 4000, 8000, 16000), frames=30, density=1 / 400):
+    """
+    Step grid flocks of one and of three species at growing sizes, with the same number of birds
+    per area, and report the time per bird. Stops the run with an AssertionError when the median
+    time per bird of the slowest size is more than FLAT_COST_RATIO times the fastest, as the cost is not linear.
+
+    :param counts: Flock sizes to try.
+    :param frames: Number of steps to time each flock.
+    :param density: Birds per square pixel.
+    """
+    rng = np.random.default_rng(0)
+    mixes = {
+        "one species": [{}],
+        "three species": [{}, {"attraction": 0.02, "cohesion": 0.01, "max_speed": 4}, {"separation": 0.5}],
+    }
+    for mix, species in mixes.items():
+        bird_costs = []
+        for count in counts:
+            side = np.sqrt(count / density)
+            flock = Flock("grid", species=species)
+            flock.spawn(rng.random((2, count)) * side, rng.normal(0, 0.5, (2, count)),
+                        rng.integers(0, len(species), count))
+            step_times = []
+            for frame in range(frames):
+                start = time.perf_counter()
+                flock.step((side / 2, side / 2))
+                step_times.append(time.perf_counter() - start)
+            report(f"flock {mix} ({count} birds)", step_times)
+            bird_costs.append(np.median(step_times) / count)
+            print(f"{'':<40} {bird_costs[-1] * 1e6:.2f} us per bird")
+        assert max(bird_costs) <= FLAT_COST_RATIO * min(bird_costs), \
+            f"flock {mix} costs {max(bird_costs) / min(bird_costs):.1f} times more per bird in some flock sizes"
+
+
+def check_nearest_neighbors(positions, k, world_size=None):
+    """
+    Check nearest_neighbors against comparing every pair of boids, stopping the run with an AssertionError
+    when the distances to the neighbors it found are not the k smallest.
+
+    :param positions: (2, N) array of boid positions.
+    :param k: How many neighbors to find.
+    :param world_size: (2, 1) array of the width and height of a wrap-around world, or None when it does not wrap.
+    """
+    count = positions.shape[1]
+    neighbors, offsets, square_distances = flock.nearest_neighbors(positions, k, world_size)
+    separations = flock.nearest_offsets(positions[:, np.newaxis, :] - positions[:, :, np.newaxis], world_size)
+    everyone = np.sum(separations * separations, 0)
+    np.fill_diagonal(everyone, np.inf)
+    assert neighbors.shape == (count, k) and not np.any(neighbors == np.arange(count)[:, np.newaxis]), \
+        "nearest_neighbors found a boid as its own neighbor"
+    assert all(len(np.unique(row)) == k for row in neighbors), "nearest_neighbors found a neighbor twice"
+    np.testing.assert_allclose(square_distances, np.sort(everyone, 1)[:, :k], rtol=PARITY_TOLERANCE,
+                               atol=PARITY_TOLERANCE, err_msg="nearest_neighbors missed a nearer boid")
+
+
+def bench_neighbors(counts=(1000, 4000), frames=10, density=1 / 400, clusters=20, spread=10):
+    """
+    Check the knn neighbors against comparing every pair, on spread out boids and on boids stacked
+    on the same spots, then step the grid engine and the knn engine from the same uniform and
+    clustered flocks. In a cluster the grid compares every pair of close boids, the KD-tree only finds k per boid.
+
+    :param counts: Flock sizes to try.
+    :param frames: Number of steps to time each flock.
+    :param density: Birds per square pixel of the whole area.
+    :param clusters: Number of clusters in the clustered flocks.
+    :param spread: Standard deviation of a cluster, in pixels.
+    """
+    rng = np.random.default_rng(0)
+    print(f"knn KD-tree: {flock.KDTREE}")
+    world_size = np.array([[SCREEN_WIDTH], [SCREEN_HEIGHT]], dtype=float)
+    for count, spots in ((300, 300), (100, 10), (200, 40), (1000, 100), (64, 1)):
+        positions = np.repeat(rng.random((2, spots)) * world_size, count // spots, 1)[:, rng.permutation(count)]
+        for wrap in (None, world_size):
+            check_nearest_neighbors(positions, flock.NEAREST_NEIGHBORS, wrap)
+        print(f"{f'knn vs every pair ({count} birds on {spots} spots)':<40} same distances")
+
+    for count in counts:
+        side = np.sqrt(count / density)
+        starts = {
+            "uniform": rng.random((2, count)) * side,
+            "clustered": np.mod(rng.random((2, clusters))[:, rng.integers(0, clusters, count)] * side
+                                + rng.normal(0, spread, (2, count)), side),
+        }
+        velocities = rng.normal(0, 0.5, (2, count))
+        for distribution, positions in starts.items():
+            for engine in ("grid", "knn"):
+                boids = Flock(engine)
+                boids.spawn(positions, velocities)
+                step_times = []
+                for frame in range(frames):
+                    start = time.perf_counter()
+                    boids.step((side / 2, side / 2))
+                    step_times.append(time.perf_counter() - start)
+                report(f"{engine} {distribution} ({count} birds)", step_times)
+
+
+BENCHMARKS = {
+    "bars": bench_bars,
+    "animation": bench_animation,
+    "background": bench_background,
+    "hud": bench_hud,
+    "kernels": bench_kernels,
+    "kills": bench_kills,
+    "neighbors": bench_neighbors,
+    "species": bench_species,
+    "sync": bench_sync,
+    "vecenv": bench_vecenv,
+}
+
+
+def main():
+    """
+    Run the benchmarks named on the command line, or all of them.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run, from: {', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    print(f"Renderer: {get_window().ctx.info.RENDERER}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
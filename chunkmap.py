@@ -0,0 +1,233 @@
+"""
+Chunked tile maps streamed from disk, for maps too big to load at once.
+
+A Tiled .tmj map is converted once into a directory holding:
+    map.json   the size of the map, its layers and its tilesets
+    tiles.npy  the tile numbers as a (chunk rows, chunk columns, layers, tiles, tiles) array
+Every chunk is one contiguous block of tiles.npy. The game opens the file memory-mapped, so a
+chunk is only read from disk when it is asked for. The chunks read most recently are kept in
+a least-recently-used cache, and chunks in the direction the camera is moving are read on a
+worker thread before they are needed.
+
+Convert a map with:
+python chunkmap.py maps/map.tmj maps/map.chunks
+and play it with --map maps/map.chunks.
+
+Required libraries to run are: argparse, collections, concurrent.futures, json, os, pathlib,
+threading, numpy and pytiled_parser
+Requires world.py
+"""
+
+# IMPORT LIBRARIES
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import pytiled_parser
+from world import MapTiles
+
+# SET FORMAT DATA
+HEADER_FILE = "map.json"
+TILES_FILE = "tiles.npy"
+FORMAT_VERSION = 1
+
+# SET STREAMING DATA
+CACHE_CHUNKS = 64
+
+
+def convert(map_file, directory, chunk_tiles=16):
+    """
+    Convert a Tiled map into a chunked map directory.
+
+    :param map_file: Path of the .tmj map.
+    :param directory: Directory to write, created if missing.
+    :param chunk_tiles: Width and height of a chunk in tiles.
+    """
+    source = MapTiles(pytiled_parser.parse_map(Path(map_file).resolve()), chunk_tiles)
+    os.makedirs(directory, exist_ok=True)
+
+    # PAD THE MAP TO WHOLE CHUNKS, THEN GROUP THE TILES OF EVERY CHUNK TOGETHER
+    layers, rows, columns = source.tiles.shape
+    chunk_rows, chunk_columns = -(-rows // chunk_tiles), -(-columns // chunk_tiles)
+    padded = np.zeros((layers, chunk_rows * chunk_tiles, chunk_columns * chunk_tiles), dtype=np.uint32)
+    padded[:, :rows, :columns] = source.tiles
+    chunks = padded.reshape(layers, chunk_rows, chunk_tiles, chunk_columns, chunk_tiles).transpose(1, 3, 0, 2, 4)
+    np.save(os.path.join(directory, TILES_FILE), np.ascontiguousarray(chunks))
+
+    # IMAGE FILES ARE STORED RELATIVE TO THE DIRECTORY SO IT CAN BE MOVED WITH THE IMAGES
+    def relative(image):
+        return os.path.relpath(os.path.abspath(image), os.path.abspath(directory))
+
+    tilesets = []
+    for tileset in source.tilesets:
+        tileset = dict(tileset)
+        tileset["image"] = relative(tileset["image"]) if tileset["image"] is not None else None
+        tileset["tile_images"] = {str(tile_id): relative(image) for tile_id, image in tileset["tile_images"].items()}
+        tilesets.append(tileset)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "columns": columns,
+        "rows": rows,
+        "tile_width": source.tile_width,
+        "tile_height": source.tile_height,
+        "chunk_tiles": chunk_tiles,
+        "layer_opacity": source.layer_opacity,
+        "tilesets": tilesets,
+    }
+    with open(os.path.join(directory, HEADER_FILE), "w") as file:
+        json.dump(header, file, indent=1)
+
+
+class ChunkedMap:
+    """
+    Tile source reading the chunks of a converted map from disk as they are needed.
+    Has the same interface as world.MapTiles.
+
+    :param directory: Directory written by convert.
+    :param cache_chunks: How many chunks are kept in memory, least recently used thrown away first.
+    """
+
+    def __init__(self, directory, cache_chunks=CACHE_CHUNKS):
+        """
+        Initialize object.
+        """
+        with open(os.path.join(directory, HEADER_FILE)) as file:
+            header = json.load(file)
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"{directory} is chunked map version {header['version']}, expected {FORMAT_VERSION}")
+
+        self.directory = directory
+        self.columns = header["columns"]
+        self.rows = header["rows"]
+        self.tile_width = header["tile_width"]
+        self.tile_height = header["tile_height"]
+        self.chunk_tiles = header["chunk_tiles"]
+        self.layer_opacity = header["layer_opacity"]
+
+        # IMAGE FILES BACK TO PATHS FROM THE WORKING DIRECTORY, TILE IDS BACK TO NUMBERS
+        self.tilesets = []
+        for tileset in header["tilesets"]:
+            if tileset["image"] is not None:
+                tileset["image"] = os.path.join(directory, tileset["image"])
+            tileset["tile_images"] = {int(tile_id): os.path.join(directory, image)
+                                      for tile_id, image in tileset["tile_images"].items()}
+            self.tilesets.append(tileset)
+
+        # MEMORY-MAPPED, NOTHING IS READ UNTIL A CHUNK IS ASKED FOR
+        self.tiles = np.load(os.path.join(directory, TILES_FILE), mmap_mode="r")
+
+        # LEAST RECENTLY USED CHUNKS FIRST, AND THE CHUNKS BEING READ IN THE BACKGROUND
+        self.cache_chunks = cache_chunks
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunks")
+        self._lock = threading.RLock()
+
+    def image_files(self):
+        """
+        Returns every image file the map's tilesets use.
+        """
+        images = []
+        for tileset in self.tilesets:
+            if tileset["image"] is not None:
+                images.append(tileset["image"])
+            images += tileset["tile_images"].values()
+        return images
+
+    def chunk(self, key):
+        """
+        Returns the (layers, rows, columns) tile numbers of a chunk, row 0 at the bottom,
+        from the cache, from a background read, or read from disk now.
+
+        :param key: The (column, row) of the chunk.
+        """
+        with self._lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            future = self.pending.get(key)
+
+        tiles = future.result() if future is not None else self._read(key)
+        self._store(key, tiles)
+        return tiles
+
+    def prefetch(self, keys):
+        """
+        Start reading chunks on the worker thread, unless they are cached or already being read.
+
+        :param keys: The (column, row) of chunks that will be needed soon.
+        """
+        chunk_rows, chunk_columns = self.tiles.shape[:2]
+        with self._lock:
+            for key in keys:
+                column, row = key
+                outside = not (0 <= column < chunk_columns and 0 <= row < chunk_rows)
+                if outside or key in self.cache or key in self.pending:
+                    continue
+                self.pending[key] = self.executor.submit(self._read, key)
+                self.pending[key].add_done_callback(lambda future, key=key: self._prefetched(key, future))
+
+    def close(self):
+        """
+        Stop the worker thread. Chunks not started yet are dropped.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _read(self, key):
+        """
+        Read one chunk from disk.
+
+        :param key: The (column, row) of the chunk.
+        """
+        column, row = key
+        return np.array(self.tiles[row, column])
+
+    def _prefetched(self, key, future):
+        """
+        Cache a chunk read on the worker thread, unless its read was cancelled.
+
+        :param key: The (column, row) of the chunk.
+        :param future: The finished read.
+        """
+        if future.cancelled():
+            with self._lock:
+                self.pending.pop(key, None)
+            return
+        self._store(key, future.result())
+
+    def _store(self, key, tiles):
+        """
+        Put a chunk in the cache, throwing away the least recently used chunks past the limit.
+
+        :param key: The (column, row) of the chunk.
+        :param tiles: Its tile numbers.
+        """
+        with self._lock:
+            self.pending.pop(key, None)
+            self.cache[key] = tiles
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_chunks:
+                self.cache.popitem(last=False)
+
+
+def main():
+    """
+    Convert a Tiled map into a chunked map directory.
+    """
+    parser = argparse.ArgumentParser(description="Convert a Tiled .tmj map into a chunked map for streaming.")
+    parser.add_argument("map_file", help="the .tmj map to convert")
+    parser.add_argument("directory", help="the chunked map directory to write")
+    parser.add_argument("--chunk-tiles", type=int, default=16, help="width and height of a chunk in tiles")
+    args = parser.parse_args()
+
+    convert(args.map_file, args.directory, args.chunk_tiles)
+    print(f"Wrote {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Entity-component storage for the bullet games.
+
+Entities of one kind live in an EntityTable. Every component is one packed NumPy array with
+the entities along its last axis, so positions are a (2, N) array like everywhere else in the
+games, and a system works on the first N columns of each array at once instead of looping
+over sprites. Components that hold objects, such as the sprite drawing an entity, are
+object arrays kept in the same order.
+
+Entities are named by generational ids: the low 32 bits are a slot that is reused after the
+entity dies, the high bits count how many times the slot was used. An id kept after its
+entity died is recognised as dead instead of finding whatever took the slot. Killing swaps
+the last entities into the holes, so the arrays stay packed and nothing after them moves.
+Any other array or list kept in the same order can be compacted the same way with swap_remove.
+
+Kills found during a frame are collected in a KillQueue and removed together at the end of
+it, so nothing is removed from an array while it is still being worked through.
+
+Required libraries to run are: numpy
+"""
+
+# IMPORT LIBRARIES
+import numpy as np
+
+# SET ID LAYOUT
+SLOT_BITS = 32
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+def swap_remove(count, rows):
+    """
+    Plan removing rows from packed arrays: the survivors among the last rows move into the
+    holes the removed rows leave before them. Costs O(k log k) for k removed rows, whatever the count.
+
+    :param count: How many rows there are.
+    :param rows: Row or array of rows to remove, repeats allowed.
+    :return: (movers, holes, end): array[..., holes] = array[..., movers], then keep array[..., :end].
+    """
+    rows = np.unique(np.atleast_1d(np.asarray(rows, dtype=np.int64)))
+    rows = rows[(rows >= 0) & (rows < count)]
+    end = count - len(rows)
+    tail = np.arange(end, count)
+    return tail[~np.isin(tail, rows, assume_unique=True)], rows[rows < end], end
+
+
+def compact(array, movers, holes, end):
+    """
+    Apply a swap_remove plan to an array along its last axis.
+
+    :param array: The array, changed in place.
+    :param movers: Rows moved into the holes.
+    :param holes: Rows they move into.
+    :param end: How many rows are left.
+    :return: The first ``end`` rows, a view of the array.
+    """
+    array[..., holes] = array[..., movers]
+    return array[..., :end]
+
+
+class KillQueue:
+    """
+    Rows to remove from several packed collections, collected during a frame and removed together.
+    """
+
+    def __init__(self):
+        """
+        Initialize object.
+        """
+        self.rows = {}
+
+    def add(self, name, rows):
+        """
+        Queue rows to remove from a collection. The same row may be queued more than once.
+
+        :param name: Name of the collection, such as "bullets".
+        :param rows: Row or array of rows.
+        """
+        self.rows.setdefault(name, []).append(np.atleast_1d(np.asarray(rows, dtype=np.int64)))
+
+    def pop(self, name):
+        """
+        Returns the sorted rows queued for a collection, each once, and empties its queue.
+
+        :param name: Name of the collection.
+        """
+        return np.unique(np.concatenate(self.rows.pop(name, [np.zeros(0, dtype=np.int64)])))
+
+
+class EntityTable:
+    """
+    Entities of one kind with packed array components.
+
+    :param components: Dictionary of component name to (shape, dtype) of one entity's value,
+        like {"position": ((2,), float), "sprite": ((), object)}.
+    :param capacity: How many entities there is room for before the arrays grow.
+    """
+
+    def __init__(self, components, capacity=64):
+        """
+        Initialize object.
+        """
+        self.components = {name: (tuple(shape), dtype) for name, (shape, dtype) in components.items()}
+        self.count = 0
+        self.arrays = {name: np.zeros(shape + (capacity,), dtype=dtype)
+                       for name, (shape, dtype) in self.components.items()}
+
+        # ROW OF EVERY SLOT (-1 WHEN FREE), SLOT OF EVERY ROW, AND HOW OFTEN EACH SLOT WAS USED
+        self.slot_rows = np.zeros(0, dtype=np.int64)
+        self.row_slots = np.zeros(capacity, dtype=np.int64)
+        self.generations = np.zeros(0, dtype=np.int64)
+        self.free_slots = []
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, name):
+        """
+        Returns the packed values of a component for every live entity, a view that can be changed in place.
+
+        :param name: Name of the component.
+        """
+        return self.arrays[name][..., :self.count]
+
+    def __setitem__(self, name, values):
+        """
+        Set the values of a component for every live entity.
+
+        :param name: Name of the component.
+        :param values: The new values, one per entity along the last axis.
+        """
+        self.arrays[name][..., :self.count] = values
+
+    @property
+    def ids(self):
+        """Returns the ids of the live entities, in row order."""
+        slots = self.row_slots[:self.count]
+        return (self.generations[slots] << SLOT_BITS) | slots
+
+    def spawn(self, count=1, **values):
+        """
+        Add entities at the end of the table.
+
+        :param count: How many entities to add.
+        :param values: Starting value of components by name, one value for all or one per entity
+            along the last axis. Components not given start at zero.
+        :return: The ids of the new entities.
+        """
+        self.reserve(self.count + count)
+        rows = np.arange(self.count, self.count + count)
+
+        # REUSE FREE SLOTS FIRST, THEN MAKE NEW ONES
+        reused = [self.free_slots.pop() for _ in range(min(count, len(self.free_slots)))]
+        new = np.arange(len(self.slot_rows), len(self.slot_rows) + count - len(reused))
+        self.slot_rows = np.concatenate([self.slot_rows, np.full(len(new), -1, dtype=np.int64)])
+        self.generations = np.concatenate([self.generations, np.zeros(len(new), dtype=np.int64)])
+        slots = np.concatenate([np.array(reused, dtype=np.int64), new])
+
+        self.slot_rows[slots] = rows
+        self.row_slots[rows] = slots
+        for name, array in self.arrays.items():
+            value = np.asarray(values.get(name, 0), dtype=array.dtype)
+            if value.shape != array.shape[:-1] + (count,):
+                value = value[..., np.newaxis]
+            array[..., rows] = value
+        self.count += count
+        return (self.generations[slots] << SLOT_BITS) | slots
+
+    def rows(self, ids):
+        """
+        Returns the rows of entities, -1 for ids whose entity is dead.
+
+        :param ids: Id or array of ids.
+        """
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        slots = ids & SLOT_MASK
+        known = slots < len(self.slot_rows)
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        alive = known.copy()
+        alive[known] = self.generations[slots[known]] == ids[known] >> SLOT_BITS
+        rows[alive] = self.slot_rows[slots[alive]]
+        return rows
+
+    def kill(self, rows):
+        """
+        Remove entities by row. The last live entities are moved into the holes, so the cost
+        only depends on how many are removed.
+
+        :param rows: Row or array of rows, repeats allowed.
+        :return: (moved_from, moved_to) rows of the entities that were moved into holes.
+        """
+        rows = np.unique(np.atleast_1d(np.asarray(rows, dtype=np.int64)))
+        rows = rows[(rows >= 0) & (rows < self.count)]
+        movers, holes, end = swap_remove(self.count, rows)
+
+        dead_slots = self.row_slots[rows]
+        self.slot_rows[dead_slots] = -1
+        self.generations[dead_slots] += 1
+        self.free_slots += dead_slots.tolist()
+
+        for array in self.arrays.values():
+            compact(array, movers, holes, end)
+            if array.dtype == object:
+                array[..., end:self.count] = None
+        self.row_slots[holes] = self.row_slots[movers]
+        self.slot_rows[self.row_slots[holes]] = holes
+        self.count = end
+        return movers, holes
+
+    def reserve(self, capacity):
+        """
+        Make sure there is room for a number of entities, doubling the arrays when there is not.
+
+        :param capacity: How many entities there must be room for.
+        """
+        size = len(self.row_slots)
+        if capacity <= size:
+            return
+        size = max(capacity, size * 2)
+        for name, array in self.arrays.items():
+            grown = np.zeros(array.shape[:-1] + (size,), dtype=array.dtype)
+            grown[..., :self.count] = array[..., :self.count]
+            self.arrays[name] = grown
+        grown = np.zeros(size, dtype=np.int64)
+        grown[:self.count] = self.row_slots[:self.count]
+        self.row_slots = grown
@@ -0,0 +1,754 @@
+"""
+Flock engine for the boids game.
+
+Keeps every boid's position and velocity in (2, N) NumPy arrays and runs the boids rules
+(attraction, cohesion, separation and alignment) over the whole flock at once.
+Four neighbor engines are available: a dense one that compares every pair of boids, a
+grid one that only compares boids in neighboring cells, a jit one that loops over the
+pairs in a compiled kernel from kernels.py, or falls back to comparing every pair with NumPy,
+and a knn one where every boid reacts to its k nearest boids instead of the boids within a radius.
+The knn engine builds a KD-tree over the boids every frame, with SciPy's cKDTree when it is
+installed, else with NumPy (see nearest_neighbors_numpy).
+
+A flock can hold several species. Every boid carries its own copy of its species' rule
+weights and top speed in per-boid arrays, so all species move in the same array pass.
+Boids keep apart from every other boid, but only line up with and gather toward their own species.
+
+The flock can live on a wrap-around world: boids leaving one edge come back in at the other,
+and every distance between boids is measured the short way around, across the edges if that
+is shorter. The grid wraps its cells the same way, so the 3x3 block of cells around a boid at
+an edge already holds the cells on the other side and wrapped neighbors need no extra pass.
+
+Required libraries to run are: numpy, scipy is optional
+Requires ecs.py and kernels.py
+"""
+
+# IMPORT LIBRARIES
+import numpy as np
+import kernels
+from ecs import compact, swap_remove
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+# PICK THE KD-TREE OF THE knn ENGINE
+KDTREE = "scipy" if cKDTree is not None else "numpy"
+
+# SET BOID RULE VALUES
+# (the distances are compared against squared distances between boids)
+MOVE_TO_MIDDLE_STRENGTH = 0.02
+ALERT_DISTANCE = 50
+FORMATION_FLYING_DISTANCE = 100
+FORMATION_FLYING_STRENGTH = 0.02
+
+# SET PLAYER ATTRACTION VALUES
+ATTRACTION_STRENGTH = .01
+ATTRACTION_FALLOFF = 1
+
+# SET SPECIES VALUES, A SPECIES ONLY NAMES THE VALUES IT CHANGES
+# (the weights multiply each rule, the top speed is in pixels per frame)
+DEFAULT_SPECIES = {
+    "attraction": ATTRACTION_STRENGTH,
+    "cohesion": MOVE_TO_MIDDLE_STRENGTH,
+    "separation": 1.0,
+    "alignment": FORMATION_FLYING_STRENGTH,
+    "max_speed": np.inf,
+}
+
+# SET NEIGHBOR ENGINES
+ENGINES = ("dense", "grid", "jit", "knn")
+
+# SET CACHING VALUES
+# Boids that drifted less than this many pixels keep their cached distances
+REFRESH_DISTANCE = 0.25
+
+# SET NEAREST NEIGHBOR VALUES, THE knn ENGINE FINDS THE k NEAREST BOIDS OF ANY SPECIES, ALIGNS WITH
+# THE ONES OF ITS OWN SPECIES AMONG THEM HOWEVER FAR AWAY AND KEEPS AWAY FROM ALL OF THEM INSIDE ALERT_DISTANCE
+NEAREST_NEIGHBORS = 7
+LEAF_SIZE = 32  # MOST BOIDS IN A LEAF OF THE KD-TREE
+BOX_TOLERANCE = 1e-9  # RELATIVE SLACK ON THE BOUNDS WHEN LEAF BOXES ARE SKIPPED, FOR ROUNDING IN THE BOX GAPS
+
+# SET GRID VALUES, THE HASH TABLE KEEPS AT LEAST TWO SLOTS PER BOID SO A SLOT HOLDS ABOUT ONE CELL
+GRID_TABLE_SIZE = 4096  # SMALLEST TABLE
+GRID_SLOTS_PER_BOID = 2
+NEIGHBOR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def nearest_offsets(offsets, world_size):
+    """
+    Returns the offsets between points on a wrap-around world, each the shortest way around.
+
+    :param offsets: (2, ...) array of offsets.
+    :param world_size: (2, 1) array of the width and height of the world, or None when it does not wrap.
+    """
+    if world_size is None:
+        return offsets
+    size = np.reshape(world_size, (2,) + (1,) * (np.ndim(offsets) - 1))
+    return offsets - size * np.floor(offsets / size + 0.5)
+
+
+def circular_means(positions, world_size, groups, group_count):
+    """
+    Returns the (2, G) mean position of every group of points on a wrap-around world. Each axis
+    is treated as a circle, so a group sitting across an edge has its middle at that edge.
+
+    :param positions: (2, N) array of positions inside the world.
+    :param world_size: (2, 1) array of the width and height of the world.
+    :param groups: (N,) integer array of the group of every point.
+    :param group_count: Number of groups.
+    """
+    angles = positions / world_size * (2 * np.pi)
+    cosines = np.array([np.bincount(groups, np.cos(angles[axis]), group_count) for axis in range(2)])
+    sines = np.array([np.bincount(groups, np.sin(angles[axis]), group_count) for axis in range(2)])
+    return np.mod(np.arctan2(sines, cosines) / (2 * np.pi), 1) * world_size
+
+
+def nearest_neighbors(positions, k, world_size=None, leaf_size=LEAF_SIZE):
+    """
+    Find the k nearest other boids of every boid, with the KD-tree picked by KDTREE.
+
+    :param positions: (2, N) array of boid positions, inside the world when it wraps.
+    :param k: How many neighbors to find, at most N - 1 are found.
+    :param world_size: (2, 1) array of the width and height of a wrap-around world, or None when it does not wrap.
+    :param leaf_size: Most boids in a leaf of the tree.
+    :return: (neighbors, offsets, square_distances): (N, k) indices of the neighbors, nearest first,
+        the (2, N, k) offsets to them and the (N, k) squared distances to them.
+    """
+    k = max(min(k, positions.shape[1] - 1), 0)
+    if k == 0:
+        neighbors = np.zeros((positions.shape[1], 0), dtype=np.int64)
+    elif KDTREE == "scipy":
+        neighbors = nearest_neighbors_scipy(positions, k, world_size, leaf_size)
+    else:
+        neighbors = nearest_neighbors_numpy(positions, k, world_size, leaf_size)
+    offsets = nearest_offsets(positions[:, neighbors] - positions[:, :, np.newaxis], world_size)
+    return neighbors, offsets, np.sum(offsets * offsets, 0)
+
+
+def nearest_neighbors_scipy(positions, k, world_size, leaf_size):
+    """
+    Returns the (N, k) indices of the k nearest other boids of every boid, from a cKDTree.
+    """
+    boxsize = None
+    points = positions.T
+    if world_size is not None:
+        boxsize = world_size[:, 0]
+        points = np.where(points >= boxsize, 0, points)
+    _, found = cKDTree(points, leafsize=leaf_size, boxsize=boxsize).query(points, k=k + 1)
+
+    # DROP EVERY BOID FROM ITS OWN ROW, OR THE FARTHEST WHEN A BOID ON THE SAME SPOT CAME FIRST
+    itself = found == np.arange(len(found))[:, np.newaxis]
+    itself[~itself.any(1), -1] = True
+    return found[~itself].reshape(len(found), k)
+
+
+def kd_leaves(positions, leaf_size):
+    """
+    Split the boids in half at the median of their widest axis, again and again, until every part
+    holds at most leaf_size boids.
+
+    :param positions: (2, N) array of boid positions.
+    :param leaf_size: Most boids in a leaf.
+    :return: List of index arrays, one per leaf.
+    """
+    leaves = []
+    parts = [np.arange(positions.shape[1])]
+    while parts:
+        part = parts.pop()
+        if len(part) <= leaf_size:
+            leaves.append(part)
+            continue
+        points = positions[:, part]
+        axis = np.argmax(points.max(1) - points.min(1))
+        half = len(part) // 2
+        order = np.argpartition(points[axis], half)
+        parts += [part[order[:half]], part[order[half:]]]
+    return leaves
+
+
+def expand_runs(starts, counts):
+    """
+    Expand runs of consecutive indices, such as the boids of KD-tree leaves, into one entry per index.
+
+    :param starts: Array of the first index of every run.
+    :param counts: Array of the length of every run.
+    :return: (runs, items): the run of every entry and its index.
+    """
+    runs = np.repeat(np.arange(len(counts)), counts)
+    items = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return runs, items
+
+
+def nearest_in_pairs(queries, candidates, square_distances, k):
+    """
+    Keep the k nearest candidates of every query, nearest first.
+
+    :param queries: Index array of the boid asking in every pair.
+    :param candidates: Index array of the other boid in every pair.
+    :param square_distances: Squared distance of every pair.
+    :param k: How many to keep for every query, which must have at least k pairs.
+    :return: (candidates, square_distances) of the kept pairs, k per query in query order.
+    """
+    # ONE SORT BY QUERY, THEN DISTANCE, FROM THE RANK OF EVERY DISTANCE
+    ranks = np.empty(len(queries), dtype=np.int64)
+    ranks[np.argsort(square_distances)] = np.arange(len(queries))
+    order = np.argsort(queries * len(queries) + ranks)
+    queries, candidates, square_distances = queries[order], candidates[order], square_distances[order]
+    counts = np.bincount(queries)
+    rank = np.arange(len(queries)) - np.repeat(np.cumsum(counts) - counts, counts)
+    keep = rank < k
+    return candidates[keep], square_distances[keep]
+
+
+def nearest_neighbors_numpy(positions, k, world_size, leaf_size):
+    """
+    Returns the (N, k) indices of the k nearest other boids of every boid, from a KD-tree built with NumPy.
+
+    The boids are split into the leaves of a KD-tree, every leaf holding at least k other boids.
+    The k-th nearest boid of a boid's own leaf bounds how far its neighbors can be. Only the leaves
+    whose boxes come within that bound are searched, first leaf by leaf, then boid by boid, all at once.
+    A boid's own leaf is always searched, so boids on the same spot, with a bound of zero, still find k.
+    """
+    count = positions.shape[1]
+    leaves = kd_leaves(positions, max(leaf_size, 2 * (k + 1)))
+    sizes = np.array([len(boids) for boids in leaves])
+    members = np.concatenate(leaves)
+    firsts = np.cumsum(sizes) - sizes
+    leaf_of = np.empty(count, dtype=np.int64)
+    leaf_of[members] = np.repeat(np.arange(len(leaves)), sizes)
+
+    def square_distances(queries, candidates):
+        offsets = nearest_offsets(np.take(positions, candidates, 1) - np.take(positions, queries, 1), world_size)
+        distances = np.sum(offsets * offsets, 0)
+        distances[queries == candidates] = np.inf
+        return distances
+
+    # BOUND EVERY BOID BY ITS k-TH NEAREST BOID OF ITS OWN LEAF, AND EVERY LEAF BY ITS LOOSEST BOID
+    pairs, candidates = expand_runs(firsts[leaf_of], sizes[leaf_of])
+    queries = np.arange(count)[pairs]
+    _, nearest = nearest_in_pairs(queries, members[candidates], square_distances(queries, members[candidates]), k)
+    bounds = nearest.reshape(count, k)[:, -1]
+    leaf_bounds = np.zeros(len(leaves))
+    np.maximum.at(leaf_bounds, leaf_of, bounds)
+    slack = BOX_TOLERANCE * (1 + np.max(np.abs(positions), initial=0)) ** 2
+
+    # BOXES OF THE LEAVES, AND THE LEAVES WHOSE BOXES COME WITHIN THE BOUND OF EVERY LEAF
+    lows = np.minimum.reduceat(np.take(positions, members, 1), firsts, 1)
+    highs = np.maximum.reduceat(np.take(positions, members, 1), firsts, 1)
+    centers = (lows + highs) / 2
+    half_sizes = (highs - lows) / 2
+    gaps = np.abs(nearest_offsets(centers[:, np.newaxis, :] - centers[:, :, np.newaxis], world_size))
+    closest = np.sum(np.maximum(gaps - half_sizes[:, :, np.newaxis] - half_sizes[:, np.newaxis, :], 0) ** 2, 0)
+    leaf, other = np.nonzero(closest <= leaf_bounds[:, np.newaxis] + slack)
+
+    # THEN THE LEAVES WHOSE BOXES COME WITHIN THE BOUND OF EVERY BOID
+    pairs, items = expand_runs(firsts[leaf], sizes[leaf])
+    queries, boxes = members[items], other[pairs]
+    gaps = np.abs(nearest_offsets(centers[:, boxes] - positions[:, queries], world_size))
+    close = np.sum(np.maximum(gaps - half_sizes[:, boxes], 0) ** 2, 0) <= bounds[queries] + slack
+    close |= boxes == leaf_of[queries]
+    queries, boxes = queries[close], boxes[close]
+
+    # COMPARE EVERY BOID WITH THE BOIDS OF THOSE LEAVES, KEEPING THE PAIRS WITHIN ITS BOUND
+    pairs, items = expand_runs(firsts[boxes], sizes[boxes])
+    queries, candidates = queries[pairs], members[items]
+    distances = square_distances(queries, candidates)
+    close = distances <= bounds[queries]
+    neighbors, _ = nearest_in_pairs(queries[close], candidates[close], distances[close], k)
+    return neighbors.reshape(count, k)
+
+
+def player_attraction(positions, target, strength=ATTRACTION_STRENGTH, falloff=ATTRACTION_FALLOFF, world_size=None):
+    """
+    Pull every boid toward a target in one array pass.
+    The pull grows with the log of the distance on each axis and is zero on top of the target.
+    On a wrap-around world every boid is pulled the short way around.
+
+    :param positions: (2, N) array of boid positions.
+    :param target: The (x, y) point the boids are pulled toward.
+    :param strength: How hard the boids are pulled.
+    :param falloff: Distance, in pixels, over which the pull ramps up.
+    :param world_size: (2, 1) array of the width and height of the world, or None when it does not wrap.
+    :return: (2, N) array of velocity changes.
+    """
+    offsets = nearest_offsets(np.asarray(target, dtype=float)[:, np.newaxis] - positions, world_size)
+    return strength * np.sign(offsets) * np.log1p(np.abs(offsets) / falloff)
+
+
+def grid_table_size(count):
+    """
+    Return the number of hash slots for a grid of count boids, the next power of two with
+    GRID_SLOTS_PER_BOID slots per boid and at least GRID_TABLE_SIZE. With a fixed table the cells of
+    a growing flock share slots, and every boid compares itself with the boids of all those cells.
+
+    :param int count: Number of boids.
+    """
+    return max(GRID_TABLE_SIZE, 1 << int(np.ceil(np.log2(max(GRID_SLOTS_PER_BOID * count, 1)))))
+
+
+class GridNeighbors:
+    """
+    Uniform grid that finds every pair of boids within a radius without comparing all pairs.
+    Cells are hashed into a table sized with grid_table_size, which also keeps a running count and
+    position sum for every cell. The table does not grow by itself, Flock builds a larger grid
+    when the flock outgrows it.
+
+    On a wrap-around world the cells are stretched a little so a whole number of them fits the
+    world, and cell coordinates wrap around, so the cells past an edge are the cells on the other side.
+
+    :param float cell_size: Width and height of a grid cell, at least the largest search radius.
+    :param int table_size: Number of hash slots used for the cells.
+    :param world_size: The (width, height) of a wrap-around world, or None when it does not wrap.
+    """
+
+    def __init__(self, cell_size, table_size=GRID_TABLE_SIZE, world_size=None):
+        self.table_size = table_size
+        self.cell_counts = None
+        self.cell_size = np.full((2, 1), float(cell_size))
+        if world_size is not None:
+            self.cell_counts = np.maximum(np.floor(np.reshape(world_size, (2, 1)) / cell_size), 1).astype(np.int64)
+            self.cell_size = np.reshape(world_size, (2, 1)) / self.cell_counts
+
+        # SLOT OF EVERY BOID AND RUNNING TOTALS FOR EVERY SLOT
+        self.slots = np.zeros(0, dtype=np.int64)
+        self.cell_count = np.zeros(table_size, dtype=np.int64)
+        self.cell_sum = np.zeros((2, table_size))
+
+    def cells_of(self, positions):
+        """
+        Return the integer (x, y) cell coordinates of each position.
+
+        :param positions: (2, N) array of positions.
+        """
+        return self.wrap_cells(np.floor(positions / self.cell_size).astype(np.int64))
+
+    def wrap_cells(self, cells):
+        """
+        Return cell coordinates wrapped around the world, unchanged when it does not wrap.
+
+        :param cells: (2, N) array of integer cell coordinates.
+        """
+        return cells if self.cell_counts is None else np.mod(cells, self.cell_counts)
+
+    def slot_of(self, cell_x, cell_y):
+        """
+        Hash cell coordinates into a slot of the table.
+
+        :param cell_x: Array of cell x coordinates.
+        :param cell_y: Array of cell y coordinates.
+        """
+        return ((cell_x * 73856093) ^ (cell_y * 19349663)) % self.table_size
+
+    def insert(self, positions):
+        """
+        Add new boids to the end of the grid.
+
+        :param positions: (2, K) array of the new boid positions.
+        """
+        cells = self.cells_of(positions)
+        slots = self.slot_of(cells[0], cells[1])
+        self.slots = np.concatenate([self.slots, slots])
+        np.add.at(self.cell_count, slots, 1)
+        np.add.at(self.cell_sum, (slice(None), slots), positions)
+
+    def remove(self, indices, positions):
+        """
+        Remove boids from the grid. The last boids move into the gaps, see ecs.swap_remove.
+
+        :param indices: Indices of the boids to remove, each once.
+        :param positions: (2, K) array of the removed boid positions.
+        """
+        slots = self.slots[indices]
+        np.subtract.at(self.cell_count, slots, 1)
+        np.subtract.at(self.cell_sum, (slice(None), slots), positions)
+        self.slots = compact(self.slots, *swap_remove(len(self.slots), indices))
+
+    def move(self, indices, old_positions, new_positions):
+        """
+        Update the running totals for boids that moved. Only the moved boids are touched.
+
+        :param indices: Indices of the boids that moved.
+        :param old_positions: (2, K) array of where they were.
+        :param new_positions: (2, K) array of where they are now.
+        """
+        old_slots = self.slots[indices]
+        cells = self.cells_of(new_positions)
+        new_slots = self.slot_of(cells[0], cells[1])
+
+        np.subtract.at(self.cell_sum, (slice(None), old_slots), old_positions)
+        np.add.at(self.cell_sum, (slice(None), new_slots), new_positions)
+
+        changed = old_slots != new_slots
+        np.subtract.at(self.cell_count, old_slots[changed], 1)
+        np.add.at(self.cell_count, new_slots[changed], 1)
+        self.slots[indices] = new_slots
+
+    def cell_centroids(self):
+        """Returns the (2, table_size) mean position of every slot, zero where the slot is empty."""
+        return self.cell_sum / np.maximum(self.cell_count, 1)
+
+    def pairs(self, positions, radius_squared):
+        """
+        Find every ordered pair of boids closer than a radius, each boid paired with itself included.
+        On a wrap-around world the distances are measured the short way around.
+
+        :param positions: (2, N) array of boid positions, matching the grid.
+        :param radius_squared: Squared search radius.
+        :return: (i, j, offsets): index arrays of the close pairs and the (2, P) offsets from i to j.
+        """
+        count = positions.shape[1]
+        order = np.argsort(self.slots, kind="stable")
+        starts = np.cumsum(self.cell_count) - self.cell_count
+        cells = self.cells_of(positions)
+
+        # SLOTS OF THE 3x3 BLOCK AROUND EVERY BOID, SKIPPING HASH DUPLICATES
+        block = np.array([self.slot_of(*self.wrap_cells(cells + np.array([[dx], [dy]])))
+                          for dx, dy in NEIGHBOR_OFFSETS])
+        duplicate = np.zeros(block.shape, dtype=bool)
+        for k in range(1, len(block)):
+            duplicate[k] = np.any(block[k] == block[:k], 0)
+
+        # EXPAND EVERY BOID INTO THE BOIDS OF ITS NEIGHBORING CELLS
+        counts = np.where(duplicate, 0, self.cell_count[block]).ravel()
+        firsts = starts[block].ravel()
+        owners = np.tile(np.arange(count), len(block))
+        total = counts.sum()
+        run_starts = np.cumsum(counts) - counts
+        i = np.repeat(owners, counts)
+        j = order[np.repeat(firsts, counts) + np.arange(total) - np.repeat(run_starts, counts)]
+
+        # KEEP ONLY THE PAIRS INSIDE THE RADIUS
+        world_size = None if self.cell_counts is None else self.cell_size * self.cell_counts
+        offsets = nearest_offsets(positions[:, j] - positions[:, i], world_size)
+        close = np.sum(offsets * offsets, 0) <= radius_squared
+        return i[close], j[close], offsets[:, close]
+
+
+class Flock:
+    """
+    Holds the state of a flock of boids and moves it one step at a time.
+    The flock keeps running aggregates, so global reductions cost only as much as what changed:
+    the position sum behind the centroid is updated on spawn, kill and move, and the dense
+    engine only recomputes distances for boids that moved more than ``refresh_distance``.
+
+    :param str engine: Neighbor engine to use, "dense", "grid", "jit" or "knn".
+    :param float refresh_distance: How far a boid may drift before its cached distances are recomputed.
+    :param species: List of dictionaries with the values of every species, see DEFAULT_SPECIES.
+        Other keys are ignored, so the game can keep the look of a species in the same dictionary.
+    :param int neighbor_count: How many nearest boids each boid reacts to with the knn engine.
+
+    set_world_size makes the flock wrap around a world of that size.
+
+    radius_scale shrinks the neighbor radii, for example when the game lowers its quality. Only the
+    grid engine does less work with smaller radii, set_engine switches to it.
+    """
+
+    def __init__(self, engine="dense", refresh_distance=REFRESH_DISTANCE, species=(DEFAULT_SPECIES,),
+                 neighbor_count=NEAREST_NEIGHBORS):
+        if engine not in ENGINES:
+            raise ValueError(f"Got {engine}, but engine must be 'dense', 'grid', 'jit' or 'knn'.")
+        self.engine = engine
+        self.refresh_distance = refresh_distance
+        self.neighbor_count = neighbor_count
+        self.radius_scale = 1.0
+        self.world_size = None
+
+        # VALUES OF EVERY SPECIES, (S,) ARRAYS BY NAME
+        self.species_values = {name: np.array([kind.get(name, default) for kind in species], dtype=float)
+                               for name, default in DEFAULT_SPECIES.items()}
+
+        # FLOCK STATE, WITH THE SPECIES OF EVERY BOID AND ITS COPY OF THE SPECIES VALUES
+        self.positions = np.zeros((2, 0))
+        self.velocities = np.zeros((2, 0))
+        self.species = np.zeros(0, dtype=np.int64)
+        self.parameters = {name: np.zeros(0) for name in DEFAULT_SPECIES}
+
+        # RUNNING AGGREGATES, PER SPECIES
+        self._species_sums = np.zeros((2, len(species)))
+        self._species_counts = np.zeros(len(species))
+        self._cached_positions = np.zeros((2, 0))
+        self._square_distances = np.zeros((0, 0))
+        self._pairs = None
+        self._neighbors = None
+        self.build_grid()
+
+    def __len__(self):
+        return self.positions.shape[1]
+
+    @property
+    def centroid(self):
+        """Returns the mean position of the flock, the circular mean on a wrap-around world."""
+        if self.world_size is not None:
+            return circular_means(self.positions, self.world_size, np.zeros(len(self), dtype=np.int64), 1)[:, 0]
+        return self._species_sums.sum(1) / max(len(self), 1)
+
+    @property
+    def species_centroids(self):
+        """
+        Returns the (2, S) mean position of every species, zero for species with no boids.
+        On a wrap-around world it is the circular mean, found again on every call.
+        """
+        if self.world_size is not None:
+            return circular_means(self.positions, self.world_size, self.species, len(self._species_counts))
+        return self._species_sums / np.maximum(self._species_counts, 1)
+
+    def set_world_size(self, world_size):
+        """
+        Make the flock wrap around a world, or stop wrapping. Boids outside the world are wrapped into it.
+
+        :param world_size: The (width, height) of the world, its corner at (0, 0), or None to stop wrapping.
+        """
+        self.world_size = None if world_size is None else np.reshape(np.asarray(world_size, dtype=float), (2, 1))
+        self.wrap(np.arange(len(self)))
+        self._cached_positions[:] = np.nan
+        self.build_grid()
+
+    def set_engine(self, engine):
+        """
+        Switch to another neighbor engine, for example to the grid while the game runs at lower quality.
+        The state the new engine keeps between steps is built again from the positions.
+
+        :param str engine: Neighbor engine to use, "dense", "grid", "jit" or "knn".
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Got {engine}, but engine must be 'dense', 'grid', 'jit' or 'knn'.")
+        if engine == self.engine:
+            return
+        self.engine = engine
+        self._pairs = None
+        self._neighbors = None
+
+        # CACHED DISTANCES AND GRID CELLS WERE NOT KEPT UP TO DATE WHILE ANOTHER ENGINE RAN
+        self._cached_positions[:] = np.nan
+        self.build_grid()
+
+    def build_grid(self):
+        """
+        Build the grid again with a table sized for the flock, holding every boid when the grid engine runs.
+        """
+        self.grid = GridNeighbors(np.sqrt(max(ALERT_DISTANCE, FORMATION_FLYING_DISTANCE)), grid_table_size(len(self)),
+                                  self.world_size)
+        if self.engine == "grid":
+            self.grid.insert(self.positions)
+
+    def wrap(self, indices):
+        """
+        Bring boids that left a wrap-around world back in at the other side, keeping the running sums in step.
+
+        :param indices: Indices of the boids that may have left.
+        """
+        if self.world_size is None:
+            return
+        positions = self.positions[:, indices]
+        wrapped = np.mod(positions, self.world_size)
+        np.add.at(self._species_sums, (slice(None), self.species[indices]), wrapped - positions)
+        self.positions[:, indices] = wrapped
+
+    def spawn(self, positions, velocities, species=0):
+        """
+        Add boids to the end of the flock.
+
+        :param positions: (2, K) array of the new boid positions.
+        :param velocities: (2, K) array of the new boid velocities.
+        :param species: Species of the new boids, one for all or one per boid.
+        :return: The indices of the new boids.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(2, -1)
+        velocities = np.asarray(velocities, dtype=float).reshape(2, -1)
+        added = positions.shape[1]
+        species = np.broadcast_to(np.asarray(species, dtype=np.int64), (added,))
+        if np.any((species < 0) | (species >= len(self._species_counts))):
+            raise ValueError(f"Got species {species}, but the flock has {len(self._species_counts)} species.")
+        start = len(self)
+
+        self.positions = np.concatenate([self.positions, positions], 1)
+        self.velocities = np.concatenate([self.velocities, velocities], 1)
+        self.species = np.concatenate([self.species, species])
+        for name, values in self.species_values.items():
+            self.parameters[name] = np.concatenate([self.parameters[name], values[species]])
+        np.add.at(self._species_sums, (slice(None), species), positions)
+        np.add.at(self._species_counts, species, 1)
+
+        # NEW BOIDS HAVE NO CACHED DISTANCES YET
+        self._cached_positions = np.concatenate([self._cached_positions, np.full((2, added), np.nan)], 1)
+        self._square_distances = np.pad(self._square_distances, ((0, added), (0, added)))
+        # A FLOCK THAT OUTGREW THE HASH TABLE GETS A LARGER ONE
+        if grid_table_size(len(self)) > self.grid.table_size:
+            self.build_grid()
+        elif self.engine == "grid":
+            self.grid.insert(positions)
+
+        return np.arange(start, len(self))
+
+    def kill(self, indices):
+        """
+        Remove boids from the flock. The last boids move into the gaps, see ecs.swap_remove,
+        so only the removed boids and the boids moved into their places are touched.
+
+        :param indices: Index or indices of the boids to remove.
+        """
+        indices = np.unique(indices)
+        np.subtract.at(self._species_sums, (slice(None), self.species[indices]), self.positions[:, indices])
+        np.subtract.at(self._species_counts, self.species[indices], 1)
+        if self.engine == "grid":
+            self.grid.remove(indices, self.positions[:, indices])
+
+        movers, holes, end = swap_remove(len(self), indices)
+        self.positions = compact(self.positions, movers, holes, end)
+        self.velocities = compact(self.velocities, movers, holes, end)
+        self.species = compact(self.species, movers, holes, end)
+        for name in self.parameters:
+            self.parameters[name] = compact(self.parameters[name], movers, holes, end)
+        self._cached_positions = compact(self._cached_positions, movers, holes, end)
+        self._square_distances[holes, :] = self._square_distances[movers, :]
+        self._square_distances = compact(self._square_distances, movers, holes, end)[:end]
+
+    def move(self, indices, offsets):
+        """
+        Move boids by an offset outside of the normal step, for example when pushed out of a wall.
+
+        :param indices: Index or indices of the boids to move.
+        :param offsets: (2,) or (2, K) array of how far to move them.
+        """
+        indices = np.atleast_1d(indices)
+        offsets = np.broadcast_to(np.asarray(offsets, dtype=float).reshape(2, -1), (2, len(indices)))
+        old_positions = self.positions[:, indices]
+
+        np.add.at(self.positions, (slice(None), indices), offsets)
+        np.add.at(self._species_sums, (slice(None), self.species[indices]), offsets)
+        self.wrap(indices)
+        if self.engine == "grid":
+            self.grid.move(indices, old_positions, self.positions[:, indices])
+
+    def square_distances(self):
+        """
+        Returns the (N, N) squared distances between boids, only recomputing the rows and columns
+        of boids that moved more than ``refresh_distance`` since they were last computed.
+        """
+        drift = self.positions - self._cached_positions
+        stale = np.flatnonzero(~(np.sum(drift * drift, 0) <= self.refresh_distance ** 2))
+
+        if len(stale) > 0:
+            separations = nearest_offsets(self.positions[:, stale, np.newaxis] - self.positions[:, np.newaxis, :],
+                                          self.world_size)
+            rows = np.sum(separations * separations, 0)
+            self._square_distances[stale, :] = rows
+            self._square_distances[:, stale] = rows.T
+            self._cached_positions[:, stale] = self.positions[:, stale]
+
+        return self._square_distances
+
+    def neighbor_sums(self, values, radius_squared, same_species=False):
+        """
+        For every boid, count its neighbors within a radius and sum their values.
+
+        :param values: (2, N) array of values to sum, such as positions or velocities.
+        :param radius_squared: Squared neighbor radius.
+        :param same_species: Only count neighbors of the boid's own species.
+        :return: (counts, sums) with shapes (N,) and (2, N).
+        """
+        if self.engine == "dense":
+            close = self.square_distances() <= radius_squared
+            if same_species:
+                close &= self.species[:, np.newaxis] == self.species[np.newaxis, :]
+            close = close.astype(float)
+            return close.sum(0), values @ close
+        if self.engine == "knn":
+            neighbors, offsets, square_distances = self._neighbors
+            close = square_distances <= radius_squared
+            if same_species:
+                close &= self.species[neighbors] == self.species[:, np.newaxis]
+            return close.sum(1) + 1.0, values + np.sum(values[:, neighbors] * close, 2)
+        if self.engine == "jit":
+            groups = self.species if same_species else np.zeros(len(self), dtype=np.int64)
+            world_size = np.zeros(2) if self.world_size is None else self.world_size[:, 0]
+            return kernels.neighbor_sums(self.positions, values, radius_squared, groups, world_size)
+
+        # THE GRID PAIRS ARE FOUND ONCE PER STEP AT THE LARGEST RADIUS, THEN FILTERED
+        i, j, offsets, square_distances = self._pairs
+        close = square_distances <= radius_squared
+        if same_species:
+            close &= self.species[i] == self.species[j]
+        i, j = i[close], j[close]
+        count = len(self)
+        sums = np.array([np.bincount(j, values[0, i], count), np.bincount(j, values[1, i], count)])
+        return np.bincount(j, minlength=count).astype(float), sums
+
+    def neighbor_offsets(self, radius_squared):
+        """
+        For every boid, sum the offsets to its neighbors of any species within a radius. On a
+        wrap-around world each offset is the short way around, as a neighbor across an edge is a world away.
+
+        :param radius_squared: Squared neighbor radius.
+        :return: (2, N) array of the summed offsets.
+        """
+        if self.engine == "knn":
+            neighbors, offsets, square_distances = self._neighbors
+            return np.sum(offsets * (square_distances <= radius_squared), 2)
+        if self.world_size is None:
+            counts, sums = self.neighbor_sums(self.positions, radius_squared)
+            return sums - self.positions * counts
+        if self.engine == "dense":
+            close = self.square_distances() <= radius_squared
+            separations = nearest_offsets(self.positions[:, np.newaxis, :] - self.positions[:, :, np.newaxis],
+                                          self.world_size)
+            return np.sum(separations * close, 2)
+        if self.engine == "jit":
+            return kernels.neighbor_offsets(self.positions, radius_squared, self.world_size[:, 0])
+
+        i, j, offsets, square_distances = self._pairs
+        close = square_distances <= radius_squared
+        count = len(self)
+        return np.array([np.bincount(i[close], offsets[0, close], count),
+                         np.bincount(i[close], offsets[1, close], count)])
+
+    def step(self, target):
+        """
+        Move the flock forward one frame.
+
+        :param target: The (x, y) point the boids are attracted to, usually the player.
+        """
+        if len(self) == 0:
+            return
+
+        if self.engine == "grid":
+            radius_squared = max(ALERT_DISTANCE, FORMATION_FLYING_DISTANCE) * self.radius_scale ** 2
+            i, j, offsets = self.grid.pairs(self.positions, radius_squared)
+            self._pairs = (i, j, offsets, np.sum(offsets * offsets, 0))
+        if self.engine == "knn":
+            self._neighbors = nearest_neighbors(self.positions, self.neighbor_count, self.world_size)
+
+        # ATTRACTION TOWARD THE TARGET
+        self.velocities += player_attraction(self.positions, target, self.parameters["attraction"],
+                                             world_size=self.world_size)
+
+        # COHESION TOWARD THE MIDDLE OF THE BOID'S OWN SPECIES
+        middles = self.species_centroids[:, self.species]
+        self.velocities -= nearest_offsets(self.positions - middles, self.world_size) * self.parameters["cohesion"]
+
+        # SEPARATION FROM BOIDS OF ANY SPECIES THAT ARE TOO CLOSE
+        offsets = self.neighbor_offsets(ALERT_DISTANCE * self.radius_scale ** 2)
+        self.velocities -= offsets * self.parameters["separation"]
+
+        # ALIGNMENT WITH BOIDS OF THE SAME SPECIES FLYING IN FORMATION, WITH knn THE ONES AMONG THE k NEAREST
+        # AT ANY DISTANCE
+        formation_radius = np.inf if self.engine == "knn" else FORMATION_FLYING_DISTANCE * self.radius_scale ** 2
+        counts, sums = self.neighbor_sums(self.velocities, formation_radius, same_species=True)
+        self.velocities -= ((self.velocities * counts - sums) / self._species_counts[self.species]
+                            * self.parameters["alignment"])
+
+        # KEEP EVERY BOID UNDER THE TOP SPEED OF ITS SPECIES
+        if np.isfinite(self.species_values["max_speed"]).any():
+            speeds = np.maximum(np.hypot(*self.velocities), 1e-12)
+            self.velocities *= np.minimum(self.parameters["max_speed"] / speeds, 1)
+
+        # MOVE, KEEPING THE RUNNING SUMS IN STEP
+        old_positions = self.positions.copy() if self.engine == "grid" else None
+        self.positions += self.velocities
+        self._species_sums += np.array([np.bincount(self.species, self.velocities[0], len(self._species_counts)),
+                                        np.bincount(self.species, self.velocities[1], len(self._species_counts))])
+        self.wrap(np.arange(len(self)))
+        if self.engine == "grid":
+            self.grid.move(np.arange(len(self)), old_positions, self.positions)
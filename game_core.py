@@ -0,0 +1,990 @@
+"""
+Shared core of the bullet games.
+Project modeled after basic set up from:
+https://api.arcade.academy/en/2.6.1/examples/sprite_bullets_aimed.html#sprite-bullets-aimed
+
+Project adjusted by:
+Sabryn Bley
+Thomas Benzshawel
+
+Holds everything the boids and follow games have in common: the player, the map, bullets,
+health bars and the game loop. How the birds move is a plug-in (see EnemyMovement), so each
+game only supplies its movement system and any improvement here benefits both games.
+Required libraries to run are: argparse, arcade, logging, math, os, time and numpy
+Requires animation.py, assets.py, bake.py, chunkmap.py, collision.py, ecs.py, governor.py, healthbar.py,
+hud.py, kernels.py, spritelists.py, startup.py, visibility.py and world.py
+"""
+
+# IMPORT LIBRARIES
+import argparse
+import arcade
+import logging
+import math
+import os
+import time
+import numpy as np
+import kernels
+from animation import AnimationStates, load_animation
+from assets import AssetLoader, tileset_images
+from bake import ChunkBaker
+from chunkmap import ChunkedMap
+from collision import box_contacts, segment_box_hits
+from ecs import EntityTable, KillQueue, compact, swap_remove
+from governor import LOGGER as GOVERNOR_LOGGER, QUALITY_LEVELS, QualityGovernor
+from healthbar import IndicatorBar, IndicatorBars
+from hud import Hud
+from spritelists import draw_sprites, swap_remove_sprites, write_sprite_data
+from startup import StartupPipeline, StartupTimer
+from visibility import view_box, visible_indices
+from world import MapTiles, TileWorld
+
+# SET SCALING VALUES
+SPRITE_SCALING_PLAYER = 0.5
+SPRITE_SCALING_BIRD = 0.02
+SPRITE_SCALING_LASER = 0.8
+TILE_SCALING = 1
+
+# SET HEALTH & DAMAGE DATA
+HEALTH_BAR_OFFSET = 32
+PLAYER_HEALTH = 100
+BIRD_HEALTH = 3
+BULLET_DAMAGE = 1
+BIRD_BAR_OFFSET = 20
+BIRD_BAR_WIDTH = 24
+
+# SET PLAYER START LOCATION
+START_X = 450
+START_Y = 200
+
+# SET SCREEN
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+SCREEN_TITLE = "Sprites, Bullets and boids Example"
+
+# SET SPEED VALUES
+PLAYER_SPEED = 5
+BULLET_SPEED = 10
+BIRD_PUSH_BACK = 20  # HOW FAR A BIRD IS PUSHED BACK OUT OF A WALL
+
+# SET USED KEYS
+MOVEMENT_KEYS = [arcade.key.LEFT, arcade.key.RIGHT, arcade.key.UP, arcade.key.DOWN]
+BULLET_SHOOTING_KEYS = [arcade.key.A, arcade.key.S, arcade.key.D, arcade.key.W]
+
+# PLAYER ANIMATION SETTINGS
+UPDATES_PER_FRAME = 5
+BIRD_UPDATES_PER_FRAME = 6  # bird.gif SHOWS EACH FRAME FOR 100 ms
+RIGHT_FACING = 0
+LEFT_FACING = 1
+
+# SET IMAGE FILES
+PLAYER_IMAGE_PATH = ":resources:images/animated_characters/robot/robot"
+PLAYER_IDLE_IMAGES = [f"{PLAYER_IMAGE_PATH}_idle.png"]
+PLAYER_WALK_IMAGES = [f"{PLAYER_IMAGE_PATH}_walk{i}.png" for i in range(8)]
+BIRD_IMAGE = "images/bird.gif"
+BULLET_IMAGE = ":resources:images/space_shooter/laserBlue01.png"
+
+# SET THE LOOK OF A BIRD SPECIES, A SPECIES ONLY NAMES WHAT IT CHANGES. share IS HOW OFTEN IT SHOWS UP
+# COMPARED TO THE OTHERS, AND ITS DAMAGE IS THE GAME'S bird_damage UNLESS IT GIVES ITS OWN
+BIRD_LOOK = {"share": 1, "image": BIRD_IMAGE, "scale": SPRITE_SCALING_BIRD, "color": arcade.color.WHITE}
+
+# BULLET COMPONENTS, THE COLLIDER IS THE HALF LENGTH AND HALF THICKNESS OF THE BULLET
+BULLET_COMPONENTS = {
+    "position": ((2,), float),
+    "velocity": ((2,), float),
+    "collider": ((2,), float),
+    "sprite": ((), object),
+}
+
+# BIRD COMPONENTS KEPT BY THE GAME, IN MOVEMENT ORDER. THE MOVEMENT PLUG-IN KEEPS THE POSITIONS,
+# VELOCITIES AND SPECIES, THE BAR IS THE SLOT OF THE BIRD'S HEALTH BAR IN THE SHARED BAR LIST
+BIRD_COMPONENTS = {
+    "health": ((), float),
+    "bar": ((), np.int64),
+    "half_size": ((2,), float),
+    "damage": ((), float),
+}
+
+# SET CAMERA CULLING
+CHUNK_TILES = 16  # MAP TILES ARE MADE AND DRAWN IN SQUARE CHUNKS OF THIS MANY TILES
+BAKE_BACKGROUND = True  # DRAW EACH MAP CHUNK ONCE INTO A TEXTURE, THEN AS ONE QUAD
+CULL_MARGIN = 32  # SPRITES THIS CLOSE TO THE VIEW STILL COUNT AS VISIBLE
+
+# SET ADAPTIVE QUALITY, LOWERED WHEN FRAMES GO OVER BUDGET AND RAISED AGAIN WHEN THERE IS ROOM (see governor.py)
+ADAPTIVE_QUALITY = True
+
+# SET WRAP-AROUND WORLD, BIRDS LEAVING AN EDGE COME BACK AT THE OTHER ONE INSTEAD OF BEING REMOVED
+WRAP_WORLD = False
+
+# SET MAP DATA
+MAP_FILE = "maps/map.tmj"  # A .tmj MAP, OR A DIRECTORY MADE FROM ONE BY chunkmap.py
+
+# WHERE ITEMS ARE ON SCREEN: (image, scale, center x, center y)
+SCENE_OBSTACLES = [
+    ("images/black.png", 1, 80, 315),  # buildings
+    ("images/black.png", 2, 670, 520),
+    ("images/black1.png", 1, 110, 500),
+    ("images/black1.png", .5, 465, 320),
+    ("images/black1.png", 2, 140, 175),
+    ("images/black1.png", 2, 700, 75),  # trees
+    ("images/black.png", 4, 300, -55),
+    ("images/black.png", 4, 360, 700),
+    ("images/black1.png", 4, 985, 350),
+    ("images/black1.png", 6, -350, 325),
+]
+
+
+class PlayerCharacter(arcade.Sprite):
+    """
+    Represents player character.
+    Based off of this tutorial: https://api.arcade.academy/en/stable/examples/sprite_move_animation.html
+
+    :param arcade.Sprite: The player sprite.
+    """
+    def __init__(self, bar_list):
+        """
+        Initialize object.
+
+        :param bar_list: Shared indicator bars the health bar is drawn with.
+        """
+
+        # CALL PARENT
+        super().__init__()
+
+        # SET UP HEALTH
+        self.health = PLAYER_HEALTH
+        self.health_bar = IndicatorBar(self, bar_list, (self.center_x, self.center_y))
+
+        # DEFAULT CHARACTER TO FACE RIGHT
+        self.character_face_direction = RIGHT_FACING
+
+        # SCALE PLAYER
+        self.scale = SPRITE_SCALING_PLAYER
+
+        # SHARED IDLE AND WALKING FRAMES, FACING RIGHT AND LEFT
+        self.idle_animation = load_animation(PLAYER_IDLE_IMAGES)
+        self.walk_animation = load_animation(PLAYER_WALK_IMAGES)
+        self.animation = AnimationStates(self.walk_animation, self.idle_animation, UPDATES_PER_FRAME, count=1)
+
+        # ADJUST COLLISION BOX TO REMOVE EMPTY SPACE.
+        self.width = 24
+        self.height = 48
+
+    def update_animation(self, delta_time: float = 1 / 60):
+        """
+        Update character animation.
+
+        :param delta_time: One second
+        """
+        changed = self.animation.update(np.array([[self.change_x], [self.change_y]]))
+        self.animation.apply([self], changed)
+        self.character_face_direction = self.animation.directions[0]
+
+
+class EnemyMovement:
+    """
+    Base class for the enemy movement plug-ins.
+    Enemy positions and velocities are kept in (2, N) arrays in the same order as the enemy sprites.
+    Subclasses decide how the enemies move by overriding step, and where they start by overriding start_state.
+    On a wrap-around world step must call wrap after moving the enemies.
+    flock.Flock has the same interface.
+    """
+
+    def __init__(self):
+        self.positions = np.zeros((2, 0))
+        self.velocities = np.zeros((2, 0))
+        self.species = np.zeros(0, dtype=np.int64)
+        self.radius_scale = 1.0  # FOR PLUG-INS WITH NEIGHBOR RADII, SEE flock.Flock
+        self.engine = None  # FOR PLUG-INS WITH A NEIGHBOR ENGINE, SEE flock.Flock.set_engine
+        self.world_size = None  # (2, 1) WIDTH AND HEIGHT OF A WRAP-AROUND WORLD
+
+    def __len__(self):
+        return self.positions.shape[1]
+
+    def start_state(self, count):
+        """
+        Returns the (positions, velocities) of the enemies at the start of a game.
+        Enemies start anywhere on screen, standing still.
+
+        :param count: How many enemies to make.
+        """
+        positions = np.random.rand(2, count) * np.array([[SCREEN_WIDTH], [SCREEN_HEIGHT]])
+        return positions, np.zeros((2, count))
+
+    def spawn(self, positions, velocities, species=0):
+        """
+        Add enemies to the end of the arrays.
+
+        :param positions: (2, K) array of the new enemy positions.
+        :param velocities: (2, K) array of the new enemy velocities.
+        :param species: Species of the new enemies, one for all or one per enemy.
+        :return: The indices of the new enemies.
+        """
+        start = len(self)
+        self.positions = np.concatenate([self.positions, np.reshape(positions, (2, -1))], 1)
+        self.velocities = np.concatenate([self.velocities, np.reshape(velocities, (2, -1))], 1)
+        self.species = np.concatenate([self.species, np.broadcast_to(np.asarray(species, dtype=np.int64),
+                                                                     (len(self) - start,))])
+        return np.arange(start, len(self))
+
+    def kill(self, indices):
+        """
+        Remove enemies. The last enemies move into the gaps, see ecs.swap_remove.
+
+        :param indices: Index or indices of the enemies to remove.
+        """
+        plan = swap_remove(len(self), indices)
+        self.positions = compact(self.positions, *plan)
+        self.velocities = compact(self.velocities, *plan)
+        self.species = compact(self.species, *plan)
+
+    def move(self, indices, offsets):
+        """
+        Move enemies by an offset, for example when pushed out of a wall.
+
+        :param indices: Index or indices of the enemies to move.
+        :param offsets: (2,) or (2, K) array of how far to move them.
+        """
+        indices = np.atleast_1d(indices)
+        offsets = np.broadcast_to(np.reshape(offsets, (2, -1)), (2, len(indices)))
+        np.add.at(self.positions, (slice(None), indices), offsets)
+        self.wrap(indices)
+
+    def set_world_size(self, world_size):
+        """
+        Make the enemies wrap around a world, or stop wrapping. Enemies outside the world are wrapped into it.
+
+        :param world_size: The (width, height) of the world, its corner at (0, 0), or None to stop wrapping.
+        """
+        self.world_size = None if world_size is None else np.reshape(np.asarray(world_size, dtype=float), (2, 1))
+        self.wrap(np.arange(len(self)))
+
+    def wrap(self, indices):
+        """
+        Bring enemies that left a wrap-around world back in at the other side.
+
+        :param indices: Indices of the enemies that may have left.
+        """
+        if self.world_size is not None:
+            self.positions[:, indices] = np.mod(self.positions[:, indices], self.world_size)
+
+    def step(self, target):
+        """
+        Move the enemies forward one frame.
+
+        :param target: The (x, y) point the enemies are going after, usually the player.
+        """
+        raise NotImplementedError
+
+
+class BulletGame(arcade.Window):
+    """
+    Main application class shared by the bullet games.
+
+    :param arcade.Window: The window the game is displayed on.
+    """
+
+    def __init__(self, movement_factory, bird_count, bird_damage, bird_species=None):
+        """
+        Initializer.
+
+        :param movement_factory: Called on every setup to make a fresh EnemyMovement.
+        :param bird_count: How many birds the game starts with.
+        :param bird_damage: Health change for the player for each bird touching them, every frame.
+        :param bird_species: List of dictionaries with the share, damage and look of every bird species,
+            see BIRD_LOOK, or None for one species. The same list can hold the species' movement values.
+        """
+        # PARENT CLASS INITIALIZER
+        super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
+
+        # Set the working directory (where we expect to find files) to the same
+        # directory this .py file is in. You can leave this out of your own
+        # code, but it is needed to easily run the examples using "python -m"
+        # as mentioned at the top of this program.
+        file_path = os.path.dirname(os.path.abspath(__file__))
+        os.chdir(file_path)
+
+        # ENEMY SETTINGS
+        self.wrapping = WRAP_WORLD
+        self.movement_factory = movement_factory
+        self.bird_count = bird_count
+        self.bird_damage = bird_damage
+        self.bird_species = [{**BIRD_LOOK, "damage": bird_damage, **kind} for kind in bird_species or [{}]]
+
+        # SPRITE LISTS
+        self.bar_list = None
+        self.bird_bar_list = None
+        self.player_list = None
+        self.boid_list = None
+        self.bullet_list = None
+        self.scene_list = None
+
+        # BULLET ENTITIES, THE SPRITES IN bullet_list ONLY DRAW THEM, IN THE SAME ORDER
+        self.bullets = None
+
+        # BIRDS AND BULLETS KILLED THIS FRAME, REMOVED ALL AT ONCE AT THE END OF IT
+        self.kills = KillQueue()
+
+        # BOXES OF THE OBSTACLES, (2, W) CENTERS AND HALF SIZES
+        self.wall_centers = None
+        self.wall_half_sizes = None
+
+        # MOVEMENT KEY
+        self.current_key = None
+
+        # BIRD INFO
+        self.movement = None
+        self.species_half_sizes = None
+        self.species_damage = None
+        self.bird_animations = None
+        self.bird_states = None
+        self.birds = None
+        self.flock_engine = None
+        self.parked_birds = None
+
+        # PLAYER INFO
+        self.player_sprite = None
+        self.score = 0
+
+        # HUD TEXT IS MADE ONCE AND ONLY LAID OUT AGAIN WHEN THE SCORE CHANGES
+        self.hud = Hud()
+        self.hud.add("score", "Score: {}", 10, 20, font_size=14, value=self.score)
+
+        # SCENE DESIGN
+        self.map_file = MAP_FILE
+        self.map_source = None
+        self.world = None
+        self.physics_engine = None
+
+        # CAMERA, THE VIEW IS THE (left, right, bottom, top) OF THE WORLD ON SCREEN
+        self.scrolling = False
+        self.camera = None
+        self.hud_camera = None
+        self.camera_view = (0, SCREEN_WIDTH, 0, SCREEN_HEIGHT)
+        self.visible_birds = None
+
+        # QUALITY, AND HOW LONG THE LAST FRAME TOOK TO DRAW
+        self.governor = QualityGovernor() if ADAPTIVE_QUALITY else None
+        self.frame_count = 0
+        self.draw_seconds = 0.0
+
+        # STARTUP
+        self.assets = None
+        self.loading = None
+        self.startup_timer = StartupTimer()
+        self.measure_startup = False
+
+    def setup(self):
+        """
+        Set up the game and initialize the variables, all at once.
+        """
+        self.start_assets()
+        for name, stage in self.setup_stages():
+            stage()
+
+    def start_loading(self):
+        """
+        Set up the game in stages, one per frame, drawing a loading screen until it is done.
+        """
+        self.start_assets()
+        self.loading = StartupPipeline(self.setup_stages(), self.startup_timer)
+
+    def start_assets(self):
+        """
+        Start decoding every image and parsing the map on worker threads.
+        Each setup stage waits only for the files it uses.
+        """
+        self.assets = AssetLoader()
+        self.close_map()
+        if os.path.isdir(self.map_file):
+            self.map_source = ChunkedMap(self.map_file)
+            self.assets.submit_many(self.map_source.image_files())
+        else:
+            self.assets.submit_map(self.map_file)
+        self.assets.submit_animation(PLAYER_IDLE_IMAGES)
+        self.assets.submit_animation(PLAYER_WALK_IMAGES)
+        for image, scale in dict.fromkeys((kind["image"], kind["scale"]) for kind in self.bird_species):
+            self.assets.submit_animation(image, scale)
+        self.assets.submit(BULLET_IMAGE)
+        self.assets.submit_many(image for image, scale, center_x, center_y in SCENE_OBSTACLES)
+
+    def setup_stages(self):
+        """
+        Returns the (name, function) stages that set up the game, in order.
+        """
+        return [
+            ("create sprite lists", self.setup_sprite_lists),
+            ("load player textures", self.setup_player),
+            ("parse map", self.setup_map),
+            ("load bird textures", self.setup_birds),
+            ("load obstacle textures", self.setup_obstacles),
+        ]
+
+    def close_map(self):
+        """
+        Stop the prefetch thread of a chunked map streamed from disk, if the game has one.
+        """
+        if self.map_source is not None:
+            self.map_source.close()
+            self.map_source = None
+
+    def close(self):
+        """
+        Stop the worker threads loading images and map chunks, then close the window.
+        """
+        if self.assets is not None:
+            self.assets.shutdown()
+        self.close_map()
+        super().close()
+
+    def setup_sprite_lists(self):
+        """
+        Create the sprite lists and reset the score.
+        """
+        # SPRITE LISTS
+        self.bar_list = IndicatorBars()
+        self.bird_bar_list = IndicatorBars(arcade.color.RED, width=BIRD_BAR_WIDTH, height=2, border_size=2,
+                                           capacity=max(self.bird_count, 1))
+        self.player_list = arcade.SpriteList()
+        self.boid_list = arcade.SpriteList()
+        self.bullet_list = arcade.SpriteList()
+        self.scene_list = arcade.SpriteList()
+        self.bullets = EntityTable(BULLET_COMPONENTS)
+        self.birds = EntityTable(BIRD_COMPONENTS, capacity=max(self.bird_count, 1))
+
+        # RESET SCORE
+        self.score = 0
+
+    def setup_player(self):
+        """
+        Create the player with its shared idle and walking frames.
+        """
+        self.assets.install_animation(PLAYER_IDLE_IMAGES)
+        self.assets.install_animation(PLAYER_WALK_IMAGES)
+        self.player_sprite = PlayerCharacter(self.bar_list)
+        self.player_sprite.center_x = START_X
+        self.player_sprite.center_y = START_Y
+        self.player_list.append(self.player_sprite)
+
+    def setup_map(self):
+        """
+        Build the tile world, and the chunks under the camera, from the map parsed on a worker thread
+        or from the chunked map streamed from disk.
+        """
+        if self.map_source is not None:
+            self.assets.install(self.map_source.image_files())
+            source = self.map_source
+        else:
+            tiled_map = self.assets.result(self.map_file)
+            self.assets.install(tileset_images(tiled_map))
+            source = MapTiles(tiled_map, CHUNK_TILES)
+        self.world = TileWorld(source, TILE_SCALING, baker=ChunkBaker(self.ctx) if BAKE_BACKGROUND else None)
+
+        # THE GAME CAMERA SCROLLS OVER THE WORLD, THE HUD CAMERA STAYS PUT
+        self.camera = arcade.Camera(self.width, self.height)
+        self.hud_camera = arcade.Camera(self.width, self.height)
+        self.update_camera()
+
+    def setup_birds(self):
+        """
+        Create the enemy movement system, the birds and their health bars.
+        """
+        # EVERY FRAME OF THE GIF, DECODED ONCE AT THE SIZE EACH SPECIES IS DRAWN
+        self.bird_animations = [self.assets.install_animation(kind["image"], kind["scale"])
+                                for kind in self.bird_species]
+        self.species_half_sizes = np.array([[animation.frame_width / 2 for animation in self.bird_animations],
+                                            [animation.frame_height / 2 for animation in self.bird_animations]])
+        self.species_damage = np.array([kind["damage"] for kind in self.bird_species], dtype=float)
+
+        # ENEMY MOVEMENT, WITH THE ENGINE IT WAS MADE WITH KEPT FOR WHEN THE QUALITY IS AT ITS BEST
+        self.movement = self.movement_factory()
+        self.flock_engine = self.movement.engine
+        if self.wrapping:
+            left, right, bottom, top = self.bird_bounds()
+            self.movement.set_world_size((right, top))
+
+        # FRAME COUNTERS, FACING AND SPECIES OF EVERY BIRD, IN MOVEMENT ORDER
+        self.bird_states = AnimationStates(self.bird_animations, updates_per_frame=BIRD_UPDATES_PER_FRAME)
+
+        # EVERY BIRD OF A SPECIES PICKED BY THE SHARES, NONE SET ASIDE YET
+        positions, velocities = self.movement.start_state(self.bird_count)
+        shares = np.array([kind["share"] for kind in self.bird_species], dtype=float)
+        species = np.random.choice(len(shares), self.bird_count, p=shares / shares.sum())
+        self.spawn_birds(positions, velocities, species, np.full(self.bird_count, BIRD_HEALTH, dtype=float))
+        self.parked_birds = (np.zeros((2, 0)), np.zeros((2, 0)), np.zeros(0, dtype=np.int64), np.zeros(0))
+
+    def setup_obstacles(self):
+        """
+        Create the invisible obstacles the player and birds collide with.
+        The loader is done once they are made, the bullet image is the last file it hands over.
+        """
+        self.assets.install([BULLET_IMAGE] + [image for image, scale, center_x, center_y in SCENE_OBSTACLES])
+        self.assets.shutdown()
+
+        # STORE WHERE ITEMS ARE ON SCREEN
+        for image, scale, center_x, center_y in SCENE_OBSTACLES:
+            obstacle = arcade.Sprite(image, scale)
+            obstacle.center_x = center_x
+            obstacle.center_y = center_y
+            self.scene_list.append(obstacle)
+        self.wall_centers = np.array([(wall.center_x, wall.center_y) for wall in self.scene_list]).reshape(-1, 2).T
+        self.wall_half_sizes = np.array([(wall.width / 2, wall.height / 2)
+                                         for wall in self.scene_list]).reshape(-1, 2).T
+
+        self.physics_engine = arcade.PhysicsEnginePlatformer(self.player_sprite,
+                                                             self.scene_list,
+                                                             gravity_constant=0)
+
+    def on_draw(self):
+        """
+        Render the screen.
+        """
+        # START RENDERING PROCESS
+        draw_start = time.perf_counter()
+        self.clear()
+        arcade.start_render()
+
+        # DRAW LOADING SCREEN UNTIL EVERY STAGE HAS RUN
+        if self.loading is not None:
+            arcade.draw_text(f"Loading: {self.loading.current_name} ({self.loading.progress:.0%}), "
+                             f"files {self.assets.finished}/{self.assets.total}",
+                             10, 20, arcade.color.WHITE, 14)
+            self.startup_timer.mark("first frame")
+            return
+
+        # DRAW THE PART OF THE WORLD UNDER THE CAMERA
+        self.camera.use()
+        self.world.draw(self.camera_view)
+
+        # DRAW ONLY THE BIRDS THE CAMERA CAN SEE. BULLETS OUTSIDE THE VIEW WERE ALREADY REMOVED
+        # AND THE PLAYER IS ALWAYS IN IT, SO THOSE LISTS ARE DRAWN WHOLE
+        draw_sprites(self.boid_list, visible_indices(self.movement.positions, self.bird_half_sizes(),
+                                                     self.camera_view, CULL_MARGIN))
+        self.bullet_list.draw()
+        self.player_list.draw()
+        self.bird_bar_list.draw()
+        self.bar_list.draw()
+
+        # PUT SCORE ON THE SCREEN
+        self.hud_camera.use()
+        self.hud["score"].set(self.score)
+        self.hud.draw()
+        self.draw_seconds = time.perf_counter() - draw_start
+
+        # REPORT STARTUP ONCE THE GAME IS ON SCREEN
+        if "first game frame" not in self.startup_timer.times:
+            self.startup_timer.mark("first frame")
+            self.startup_timer.mark("first game frame")
+            if self.measure_startup:
+                print(self.startup_timer.report())
+                self.close()
+
+    def on_key_press(self, key, modifiers):
+        """
+        Called whenever a key is pressed. Perform the corresponding actions.
+
+        :param key: The key that was pressed on the keyboard.
+        :param modifiers: Bitwise AND of all modifiers (shift, ctrl, num lock) pressed during this event.
+        """
+        # IGNORE KEYS WHILE LOADING
+        if self.loading is not None:
+            return
+
+        # MOVE WITH ARROW KEYS
+        if key in MOVEMENT_KEYS:
+            self.current_key = key
+            if key == arcade.key.LEFT:
+                self.player_sprite.change_x = -PLAYER_SPEED  # move left
+            elif key == arcade.key.RIGHT:
+                self.player_sprite.change_x = PLAYER_SPEED  # move right
+            elif key == arcade.key.DOWN:
+                self.player_sprite.change_y = -PLAYER_SPEED  # move down
+            elif key == arcade.key.UP:
+                self.player_sprite.change_y = PLAYER_SPEED  # move up
+
+        # SHOOT BULLETS WITH A,S,D,W KEYS
+        elif key in BULLET_SHOOTING_KEYS:
+            if key == arcade.key.A:
+                self.shoot_bullet(180)  # shoot left
+            elif key == arcade.key.D:
+                self.shoot_bullet(0)  # shoot right
+            elif key == arcade.key.W:
+                self.shoot_bullet(90)  # shoot up
+            elif key == arcade.key.S:
+                self.shoot_bullet(-90)  # shoot down
+
+    def on_key_release(self, key, modifiers):
+        """
+        Called whenever a key is released. Perform the corresponding actions.
+
+        :param key: The key that was pressed on the keyboard.
+        :param modifiers: Bitwise AND of all modifiers (shift, ctrl, num lock) pressed during this event.
+        """
+        # IGNORE KEYS WHILE LOADING
+        if self.loading is not None:
+            return
+
+        # STOP MOVEMENT
+        if key == arcade.key.UP or key == arcade.key.DOWN:
+            self.player_sprite.change_y = 0
+        elif key == arcade.key.LEFT or key == arcade.key.RIGHT:
+            self.player_sprite.change_x = 0
+
+        self.current_key = None
+
+    def collision_logic(self, sprite, collide_list, move_back_distance=20):
+        collision_locations = [(collide.center_x, collide.center_y) for collide in collide_list]
+
+        if sprite.change_y < 0 and sprite.center_y > collision_locations[0][1]:  # trying to move down
+            sprite.center_y += move_back_distance
+        elif sprite.change_y > 0 and sprite.center_y < collision_locations[0][1]:  # trying to move up
+            sprite.center_y -= move_back_distance
+        elif sprite.change_x < 0 and sprite.center_x > collision_locations[0][0]:  # trying to move left
+            sprite.center_x += move_back_distance
+        elif sprite.change_x > 0 and sprite.center_y < collision_locations[0][0]:  # trying to move right
+            sprite.center_x -= move_back_distance
+
+    def on_update(self, delta_time):
+
+        # RUN ONE LOADING STAGE PER FRAME UNTIL EVERYTHING IS LOADED
+        if self.loading is not None:
+            self.loading.run_next()
+            if self.loading.done:
+                self.loading = None
+            return
+        update_start = time.perf_counter()
+        self.frame_count += 1
+        quality = self.governor.settings if self.governor is not None else QUALITY_LEVELS[0]
+        self.movement.radius_scale = quality["radius_scale"]
+        if self.flock_engine is not None:
+            self.movement.set_engine(quality["flock_engine"] or self.flock_engine)
+
+        # PUSH BIRDS BACK OUT OF WALLS AGAINST THE WAY THEY WERE MOVING, THE SPRITES FOLLOW IN update_birds
+        offsets, stopped = kernels.wall_pushes(self.movement.positions, self.movement.velocities,
+                                               self.bird_half_sizes(),
+                                               self.wall_centers, self.wall_half_sizes, BIRD_PUSH_BACK)
+        pushed = np.flatnonzero(stopped.any(0))
+        if len(pushed) > 0:
+            self.movement.move(pushed, offsets[:, pushed])
+            self.movement.velocities[stopped] = 0
+
+        self.update_birds(self.boid_list)
+
+        # UPDATE PLAYER LOCATION
+        collide_list = arcade.check_for_collision_with_list(self.player_sprite, self.scene_list)
+
+        if len(collide_list) == 0:
+            self.player_list.update()
+            self.player_sprite.health_bar.position = (self.player_sprite.center_x,
+                                                      self.player_sprite.center_y + HEALTH_BAR_OFFSET,)
+        else:
+            self.collision_logic(self.player_sprite, collide_list, move_back_distance=40)
+
+        # UPDATE PLAYER ANIMATION
+        self.player_list.update_animation()
+
+        # FOLLOW THE PLAYER AND FIND THE BIRDS THE CAMERA CAN SEE
+        self.update_camera()
+        self.visible_birds = visible_indices(self.movement.positions, self.bird_half_sizes(),
+                                             self.camera_view, CULL_MARGIN)
+
+        # MOVE THE BIRD HEALTH BARS, AT LOWER QUALITY ONLY THE ONES THE CAMERA CAN SEE
+        if quality["bars_near_camera"]:
+            self.bird_bar_list.set_positions(self.birds["bar"][self.visible_birds],
+                                             self.bird_bar_positions()[:, self.visible_birds])
+        else:
+            self.bird_bar_list.set_positions(self.birds["bar"], self.bird_bar_positions())
+
+        # ANIMATE ALL BIRDS AT ONCE, ONLY VISIBLE BIRDS THAT CHANGED FRAME GET A NEW TEXTURE,
+        # AT LOWER QUALITY ONLY EVERY FEW FRAMES, CATCHING UP ON THE FRAMES SKIPPED
+        changed = self.bird_states.update(self.movement.velocities)
+        if self.frame_count % quality["animation_every"] == 0:
+            self.bird_states.apply(self.boid_list, np.intersect1d(changed, self.visible_birds, assume_unique=True))
+
+        # MOVE ALL BULLETS, REMEMBERING WHERE EACH ONE STARTED THIS TICK
+        starts = self.bullets["position"].copy()
+        self.bullets["position"] += self.bullets["velocity"]
+
+        # CHECK IF A BULLET HIT AN ENEMY
+        if len(self.bullets) > 0:
+            self.shoot_birds(starts)
+
+        # REMOVE BULLETS OFF OF SCREEN, A BULLET REACHES AS FAR AS ITS HALF LENGTH IN ANY DIRECTION
+        reach = np.broadcast_to(self.bullets["collider"].max(0), (2, len(self.bullets)))
+        center, half_size = view_box(self.camera_view)
+        self.kill_bullets(np.flatnonzero(~box_contacts(self.bullets["position"], reach, center, half_size)))
+
+        # REMOVE ENEMIES THAT LEFT THE SCREEN, OR THE WORLD WHEN SCROLLING, ALL AT ONCE. ON A WRAP-AROUND
+        # WORLD THEY CAME BACK AT THE OTHER EDGE INSTEAD
+        if not self.wrapping:
+            inside = visible_indices(self.movement.positions, self.bird_half_sizes(), self.bird_bounds())
+            if len(inside) < len(self.movement):
+                self.kill_bird(np.setdiff1d(np.arange(len(self.movement)), inside))
+
+        # REMOVE EVERYTHING KILLED THIS FRAME IN ONE PASS, THEN SHOW WHERE THE BULLETS ARE
+        self.apply_kills()
+        self.sync_bullet_sprites()
+
+        # AT THE LOWEST QUALITY, SET THE BIRDS PAST THE CAP ASIDE, THEY COME BACK WHEN THERE IS ROOM AGAIN
+        self.cap_birds(quality["bird_cap"])
+
+        # CHECK IF ENEMIES HIT PLAYER, ALL BIRDS AT ONCE
+        hits = np.flatnonzero(box_contacts(self.movement.positions,
+                                           self.bird_half_sizes(),
+                                           self.player_sprite.position,
+                                           (self.player_sprite.width / 2, self.player_sprite.height / 2)))
+
+        # ADJUST HEALTH ONCE FOR ALL HITS, EVERY BIRD DOING THE DAMAGE OF ITS SPECIES
+        if len(hits) > 0:
+            self.player_sprite.health = (self.player_sprite.health
+                                         + self.birds["damage"][hits].sum())
+
+            # CHECK IF PLAYER IS DEAD, IF NOT UPDATE HEALTH BAR
+            if self.player_sprite.health <= 0:
+                arcade.exit()
+                self.player_sprite.health_bar.fullness = (0 / PLAYER_HEALTH)
+            else:
+                self.player_sprite.health_bar.fullness = (self.player_sprite.health / PLAYER_HEALTH)
+
+        # LET THE GOVERNOR PICK THE QUALITY OF THE NEXT FRAMES FROM THIS UPDATE AND THE LAST DRAW
+        if self.governor is not None:
+            self.governor.observe(time.perf_counter() - update_start + self.draw_seconds)
+
+    def shoot_bullet(self, angle):
+        """
+        Helper method to shoot a bullet in the specified angle.
+
+        :param angle: The direction the bullet goes.
+        """
+        # CREATE BULLET
+        bullet = arcade.Sprite(BULLET_IMAGE, SPRITE_SCALING_LASER)
+
+        # START BULLET AT PLAYER POSITION
+        start_x = self.player_sprite.center_x
+        start_y = self.player_sprite.center_y
+        bullet.center_x = start_x
+        bullet.center_y = start_y
+
+        # SET ANGLE
+        bullet.angle = angle
+
+        # CALCULATE VELOCITY BASED ON ANGLE
+        velocity = (math.cos(math.radians(angle)) * BULLET_SPEED, math.sin(math.radians(angle)) * BULLET_SPEED)
+
+        # ADD BULLET TO THE BULLET ENTITIES AND ITS SPRITE TO THE BULLET SPRITE LIST
+        self.bullets.spawn(position=(start_x, start_y), velocity=velocity,
+                           collider=(bullet.width / 2, bullet.height / 2), sprite=bullet)
+        self.bullet_list.append(bullet)
+
+    def shoot_birds(self, starts):
+        """
+        Find the first bird each bullet ran into on its way this tick, remove those bullets and damage
+        those birds. Bullets are tested along their whole path, so they cannot skip over a bird at any speed.
+
+        :param starts: (2, N) array of where the bullets were before they moved.
+        """
+        # THE PATH OF A BULLET COVERS ITS WHOLE LENGTH, FROM ITS TAIL AT THE START TO ITS TIP AT THE END
+        velocities = self.bullets["velocity"]
+        half_lengths, half_thicknesses = self.bullets["collider"]
+        reach = velocities / np.hypot(*velocities) * half_lengths
+        hit_bullets, hit_birds, _ = segment_box_hits(starts - reach,
+                                                      self.bullets["position"] + reach,
+                                                      self.movement.positions,
+                                                      self.bird_half_sizes(),
+                                                      radius=half_thicknesses.max())
+
+        # REMOVE BULLETS THAT HIT, DAMAGE EVERY BIRD ONCE PER BULLET
+        self.kill_bullets(hit_bullets)
+        health = self.birds["health"]
+        np.subtract.at(health, hit_birds, BULLET_DAMAGE)
+
+        # UPDATE SCORE FOR BIRDS THAT DIED, HEALTH BARS FOR THE REST
+        hit_birds = np.unique(hit_birds)
+        dead = hit_birds[health[hit_birds] <= 0]
+        wounded = hit_birds[health[hit_birds] > 0]
+        if len(wounded) > 0:
+            self.bird_bar_list.set_fullness(self.birds["bar"][wounded], health[wounded] / BIRD_HEALTH)
+        if len(dead) > 0:
+            self.kill_bird(dead)
+            self.score += len(dead)
+
+    def kill_bullets(self, rows):
+        """
+        Queue bullets to be removed at the end of the frame.
+
+        :param rows: Array of rows of the bullets in the bullet entities and bullet_list.
+        """
+        self.kills.add("bullets", rows)
+
+    def sync_bullet_sprites(self):
+        """
+        Write the bullet positions into the bullet sprite buffer.
+        """
+        write_sprite_data(self.bullet_list, self.bullets["position"])
+
+    def spawn_birds(self, positions, velocities, species, health):
+        """
+        Add birds to the end of every bird array and sprite list.
+
+        :param positions: (2, K) array of the new bird positions.
+        :param velocities: (2, K) array of the new bird velocities.
+        :param species: (K,) array of the species of the new birds.
+        :param health: (K,) array of the health of the new birds.
+        """
+        if len(health) == 0:
+            return
+        rows = self.movement.spawn(positions, velocities, species)
+        self.movement.wrap(rows)
+        positions = self.movement.positions[:, rows]
+
+        # HEALTH, A SHARED BAR SLOT, AND THE SIZE AND DAMAGE OF ITS SPECIES FOR EVERY BIRD, IN MOVEMENT ORDER
+        bars = self.bird_bar_list.add_many(positions + np.array([[0], [BIRD_BAR_OFFSET]]))
+        self.bird_bar_list.set_fullness(bars, health / BIRD_HEALTH)
+        self.birds.spawn(len(rows), health=health, bar=bars,
+                         half_size=self.species_half_sizes[:, species], damage=self.species_damage[species])
+        self.bird_states.spawn(len(rows), species)
+
+        # CREATE BIRDS, EVERY SPECIES SHARING THE SAME FRAME TEXTURES
+        for position, velocity, kind in zip(positions.T, self.movement.velocities[:, rows].T, species):
+            bird = arcade.Sprite(texture=self.bird_animations[kind].texture(0))
+            bird.color = self.bird_species[kind]["color"]
+            bird.center_x, bird.center_y = position
+            bird.change_x, bird.change_y = velocity
+            self.boid_list.append(bird)
+
+    def cap_birds(self, cap):
+        """
+        Keep at most a number of birds in play. The birds past the cap are set aside with their movement,
+        species and health, and come back where they left once the cap is raised or lifted.
+
+        :param cap: Most birds in play, or None for no cap.
+        """
+        count = len(self.movement)
+        parked = self.parked_birds
+        if cap is not None and count > cap:
+            rows = np.arange(cap, count)
+            leaving = (self.movement.positions[:, rows], self.movement.velocities[:, rows],
+                       self.movement.species[rows], self.birds["health"][rows])
+            self.parked_birds = tuple(np.concatenate([old, new], -1) for old, new in zip(parked, leaving))
+            self.kill_bird(rows)
+            self.apply_kills()
+        elif len(parked[3]) > 0 and (cap is None or count < cap):
+            back = len(parked[3]) if cap is None else min(cap - count, len(parked[3]))
+            keep = len(parked[3]) - back
+            self.parked_birds = tuple(array[..., :keep] for array in parked)
+            self.spawn_birds(*(array[..., keep:] for array in parked))
+
+    def kill_bird(self, index):
+        """
+        Queue birds to be removed at the end of the frame.
+
+        :param index: The index or indices of the birds in the movement arrays and boid_list.
+        """
+        self.kills.add("birds", index)
+
+    def apply_kills(self):
+        """
+        Remove the birds and bullets killed this frame. Every array and sprite list of a kind is
+        compacted with the same swap-remove, so they stay in the same order, and the cost only
+        depends on how many were killed.
+        """
+        rows = self.kills.pop("bullets")
+        if len(rows) > 0:
+            swap_remove_sprites(self.bullet_list, rows)
+            self.bullets.kill(rows)
+
+        # BIRDS: HEALTH BARS, BIRD COMPONENTS, MOVEMENT, ANIMATION STATES AND SPRITES
+        index = self.kills.pop("birds")
+        if len(index) > 0:
+            self.bird_bar_list.remove(self.birds["bar"][index])
+            self.birds.kill(index)
+            self.movement.kill(index)
+            self.bird_states.kill(index)
+            swap_remove_sprites(self.boid_list, index)
+
+    def update_camera(self):
+        """
+        When scrolling, center the camera on the player without showing past the edges of the world,
+        then make the tile chunks around it. Without scrolling the camera shows the first screen of the world.
+        """
+        x, y = 0, 0
+        if self.scrolling:
+            x = min(max(self.player_sprite.center_x - self.width / 2, 0), max(self.world.width - self.width, 0))
+            y = min(max(self.player_sprite.center_y - self.height / 2, 0), max(self.world.height - self.height, 0))
+        self.camera.move_to((x, y))
+        self.camera_view = (x, x + self.width, y, y + self.height)
+        self.world.update(self.camera_view)
+
+    def bird_bounds(self):
+        """
+        Returns the (left, right, bottom, top) birds are removed outside of, or wrap around:
+        the world when scrolling, else the screen.
+        """
+        if self.scrolling:
+            return 0, self.world.width, 0, self.world.height
+        return 0, self.width, 0, self.height
+
+    def bird_half_sizes(self):
+        """
+        Returns the (2, N) half width and half height of every bird, from the size its species is drawn at.
+        """
+        return self.birds["half_size"]
+
+    def bird_bar_positions(self):
+        """
+        Returns the (2, N) centers of the bird health bars, just above each bird.
+        """
+        return self.movement.positions + np.array([[0], [BIRD_BAR_OFFSET]])
+
+    def update_birds(self, birds):
+        """
+        Move the birds one step toward the player and write the positions into the bird sprite buffer.
+
+        :param birds: The bird sprite list, in the same order as the movement arrays.
+        """
+        self.movement.step((self.player_sprite.center_x, self.player_sprite.center_y))
+        write_sprite_data(birds, self.movement.positions)
+
+
+def run(game_class):
+    """
+    Open the game window straight away, then load the game in stages while it shows a loading screen.
+    With --measure-startup on the command line, the startup times are printed once the game is on screen
+    and the game closes. With --scroll the camera follows the player over the whole map.
+    With --wrap birds leaving an edge come back at the other one.
+
+    :param game_class: The BulletGame subclass to run.
+    """
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="report import, texture, map and first frame times, then exit")
+    parser.add_argument("--scroll", action="store_true",
+                        help="scroll the camera with the player over the whole map")
+    parser.add_argument("--wrap", action="store_true",
+                        help="wrap the birds around the edges instead of removing them")
+    parser.add_argument("--map",
+                        help="the .tmj map to play, or a chunked map directory made by chunkmap.py")
+    args = parser.parse_args()
+
+    # SHOW WHY THE QUALITY CHANGES, SEE governor.py
+    logging.basicConfig(format="%(message)s")
+    GOVERNOR_LOGGER.setLevel(logging.INFO)
+
+    # THE GAME CHANGES TO ITS OWN DIRECTORY, SO FIND THE MAP FROM WHERE IT WAS STARTED
+    map_file = os.path.abspath(args.map) if args.map is not None else MAP_FILE
+
+    timer = StartupTimer()
+    timer.mark("imports")
+    with timer.measure("open window"):
+        game = game_class()
+    game.startup_timer = timer
+    game.measure_startup = args.measure_startup
+    game.scrolling = args.scroll
+    game.wrapping = args.wrap or WRAP_WORLD
+    game.map_file = map_file
+
+    game.start_loading()
+    arcade.run()
+
+    # arcade.exit LEAVES THE WINDOW OPEN, CLOSE IT SO THE WORKER THREADS STOP TOO
+    if not game.has_exit:
+        game.close()
@@ -0,0 +1,105 @@
+"""
+Adaptive quality for the bullet games.
+
+The governor is told how long every frame's update and draw took. When the frames keep going
+over the frame budget it lowers the quality one level, and when they keep coming in well under
+it, it raises the quality back one level. It goes by the median frame of the last few, so a
+single slow frame, such as the first draw or a garbage collection, changes nothing.
+Each level gives up a little more fidelity:
+    1. health bars only follow the birds near the camera
+    2. bird animation advances every other frame
+    3. flocks switch to the grid engine with smaller neighbor radii, so fewer pairs of birds are
+       compared. Enemy movement without neighbors, such as following the player, is unchanged
+    4. the number of birds in play is capped, the birds past the cap are set aside and come back
+       when the quality is raised again
+Every change is logged with the frame times that caused it, on the logger of this module.
+
+Required libraries to run are: collections, logging and numpy
+"""
+
+# IMPORT LIBRARIES
+import logging
+from collections import deque
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+# SET FRAME BUDGET (seconds of update and draw per frame)
+FRAME_BUDGET = 1 / 60
+
+# SET WHEN TO CHANGE QUALITY
+WINDOW_FRAMES = 30  # FRAMES LOOKED AT, AND FRAMES WAITED AFTER EVERY CHANGE
+OVER_BUDGET = 0.9  # LOWER QUALITY WHEN THE MEDIAN FRAME TAKES MORE THAN THIS PART OF THE BUDGET
+UNDER_BUDGET = 0.5  # RAISE QUALITY WHEN THE MEDIAN FRAME TAKES LESS THAN THIS PART OF THE BUDGET
+
+# QUALITY LEVELS, BEST FIRST. flock_engine IS THE ENGINE FLOCKS SWITCH TO, None TO KEEP THEIR OWN
+QUALITY_LEVELS = [
+    {"bars_near_camera": False, "animation_every": 1, "flock_engine": None, "radius_scale": 1.0, "bird_cap": None},
+    {"bars_near_camera": True, "animation_every": 1, "flock_engine": None, "radius_scale": 1.0, "bird_cap": None},
+    {"bars_near_camera": True, "animation_every": 2, "flock_engine": None, "radius_scale": 1.0, "bird_cap": None},
+    {"bars_near_camera": True, "animation_every": 2, "flock_engine": "grid", "radius_scale": 0.7, "bird_cap": None},
+    {"bars_near_camera": True, "animation_every": 2, "flock_engine": "grid", "radius_scale": 0.7, "bird_cap": 500},
+]
+
+
+class QualityGovernor:
+    """
+    Picks a quality level from the measured frame times.
+
+    :param levels: Settings of every quality level, best first.
+    :param budget: Seconds of update and draw per frame to stay under.
+    :param window: How many frames are looked at before a change, and waited after it.
+    :param log: Called with a line of text on every change, by default logged at INFO level.
+    """
+
+    def __init__(self, levels=QUALITY_LEVELS, budget=FRAME_BUDGET, window=WINDOW_FRAMES, log=LOGGER.info):
+        """
+        Initialize object.
+        """
+        self.levels = levels
+        self.budget = budget
+        self.window = window
+        self.log = log
+        self.level = 0
+        self.frame_times = deque(maxlen=window)
+        self.changes = []
+
+    @property
+    def settings(self):
+        """Returns the settings of the current quality level."""
+        return self.levels[self.level]
+
+    def observe(self, seconds):
+        """
+        Record how long a frame took and change the quality level if the last frames call for it.
+
+        :param seconds: Seconds of update and draw of the frame.
+        :return: True if the quality level changed.
+        """
+        self.frame_times.append(seconds)
+        if len(self.frame_times) < self.window:
+            return False
+
+        median = np.median(self.frame_times)
+        if median > self.budget * OVER_BUDGET and self.level < len(self.levels) - 1:
+            self.change(self.level + 1, median)
+            return True
+        if median < self.budget * UNDER_BUDGET and self.level > 0:
+            self.change(self.level - 1, median)
+            return True
+        return False
+
+    def change(self, level, median):
+        """
+        Go to another quality level, log why, and wait a full window before the next change.
+
+        :param level: The new level.
+        :param median: Median frame time that caused the change.
+        """
+        worst = max(self.frame_times)
+        self.log(f"Quality {self.level} -> {level}: the median frame took {median * 1000:.1f} ms and the worst "
+                 f"{worst * 1000:.1f} ms over the last {len(self.frame_times)} frames, "
+                 f"budget {self.budget * 1000:.1f} ms. Now {self.levels[level]}")
+        self.changes.append((self.level, level, median, worst))
+        self.level = level
+        self.frame_times.clear()
@@ -7,9 +7,11 @@ If Python and Arcade are installed, this example can be run from the command lin
 python -m arcade.examples.sprite_health
 """
 import math
-from typing import Tuple
+from typing import List, Tuple
 
 import arcade
+import numpy as np
+from arcade.gl import BufferDescription
 from arcade.resources import (
     image_female_person_idle,
     image_laser_blue01,
@@ -45,7 +47,7 @@ def sprite_off_screen(
 
 
 class Player(arcade.Sprite):
-    def __init__(self, bar_list: arcade.SpriteList) -> None:
+    def __init__(self, bar_list: "IndicatorBars") -> None:
         super().__init__(
             filename=image_female_person_idle,
             scale=SPRITE_SCALING_PLAYER,)
@@ -56,123 +58,298 @@ class Player(arcade.Sprite):
 
 
 
-class IndicatorBar:
-    """
-    Represents a bar which can display information about a sprite.
+BAR_VERTEX_SHADER = """
+#version 330
 
-    :param Player owner: The owner of this indicator bar.
-    :param arcade.SpriteList sprite_list: The sprite list used to draw the indicator
-    bar components.
-    :param Tuple[float, float] position: The initial position of the bar.
-    :param arcade.Color full_color: The color of the bar.
-    :param arcade.Color background_color: The background color of the bar.
-    :param int width: The width of the bar.
-    :param int height: The height of the bar.
-    :param int border_size: The size of the bar's border.
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+uniform vec2 outer_size;
+
+in vec2 in_vert;
+in vec2 in_center;
+in float in_fullness;
+in float in_visible;
+
+out vec2 v_local;
+out float v_fullness;
+
+void main() {
+    v_local = in_vert * outer_size;
+    v_fullness = in_fullness;
+    gl_Position = proj.matrix * vec4(in_center + v_local, 0.0, 1.0) * in_visible;
+}
+"""
+
+BAR_FRAGMENT_SHADER = """
+#version 330
+
+uniform vec2 box_size;
+uniform float left_offset;
+uniform vec4 full_color;
+uniform vec4 background_color;
+
+in vec2 v_local;
+in float v_fullness;
+
+out vec4 out_color;
+
+void main() {
+    bool inside = abs(v_local.y) <= box_size.y / 2.0
+        && v_local.x >= -left_offset
+        && v_local.x <= -left_offset + box_size.x * v_fullness;
+    out_color = inside ? full_color : background_color;
+}
+"""
+
+
+class IndicatorBars:
+    """
+    Draws many indicator bars, such as one health bar per enemy, with a single instanced draw call.
+    The state of every bar lives in one NumPy array. A bar is only marked dirty when one of its
+    values actually changes, and all dirty bars are sent to the GPU in one buffer write per frame.
+
+    :param arcade.Color full_color: The color of the bars.
+    :param arcade.Color background_color: The background color of the bars.
+    :param int width: The width of each bar.
+    :param int height: The height of each bar.
+    :param int border_size: The size of each bar's border.
+    :param int capacity: How many bars to make room for up front.
     """
 
     def __init__(
             self,
-            owner: Player,
-            sprite_list: arcade.SpriteList,
-            position: Tuple[float, float] = (0, 0),
             full_color: arcade.Color = arcade.color.GREEN,
             background_color: arcade.Color = arcade.color.BLACK,
             width: int = 100,
             height: int = 4,
             border_size: int = 4,
+            capacity: int = 16,
     ) -> None:
-        # Store the reference to the owner and the sprite list
-        self.owner: Player = owner
-        self.sprite_list: arcade.SpriteList = sprite_list
-
-        # Set the needed size variables
+        # Set the needed size and color variables, shared by every bar
+        self._full_color: Tuple[float, ...] = _normalized_color(full_color)
+        self._background_color: Tuple[float, ...] = _normalized_color(background_color)
         self._box_width: int = width
         self._box_height: int = height
-        self._half_box_width: int = self._box_width // 2
-        self._center_x: float = 0.0
-        self._center_y: float = 0.0
-        self._fullness: float = 0.0
-
-        # Create the boxes needed to represent the indicator bar
-        self._background_box: arcade.SpriteSolidColor = arcade.SpriteSolidColor(
-            self._box_width + border_size,
-            self._box_height + border_size,
-            background_color,
-            )
-        self._full_box: arcade.SpriteSolidColor = arcade.SpriteSolidColor(
-            self._box_width,
-            self._box_height,
-            full_color,
-        )
-        self.sprite_list.append(self._background_box)
-        self.sprite_list.append(self._full_box)
+        self._border_size: int = border_size
 
-        # Set the fullness and position of the bar
-        self.fullness: float = 1.0
-        self.position: Tuple[float, float] = position
+        # One row per bar: center x, center y, fullness, visible
+        self._data: np.ndarray = np.zeros((capacity, 4), dtype="f4")
+        self._count: int = 0
+        self._free: List[int] = []
 
-    def __repr__(self) -> str:
-        return f"<IndicatorBar (Owner={self.owner})>"
+        # Range of rows that changed since the last draw
+        self._dirty_low: int = capacity
+        self._dirty_high: int = 0
+
+        # GPU resources are created on the first draw, once a window exists
+        self._program = None
+        self._quad = None
+        self._buffer = None
+        self._geometry = None
+        self._buffer_rows: int = 0
+
+    def __len__(self) -> int:
+        return self._count - len(self._free)
 
     @property
-    def background_box(self) -> arcade.SpriteSolidColor:
-        """Returns the background box of the indicator bar."""
-        return self._background_box
+    def positions(self) -> np.ndarray:
+        """Returns a (2, N) view of the bar centers, indexed by slot."""
+        return self._data[:self._count, :2].T
 
     @property
-    def full_box(self) -> arcade.SpriteSolidColor:
-        """Returns the full box of the indicator bar."""
-        return self._full_box
+    def fullness(self) -> np.ndarray:
+        """Returns a (N,) view of the bar fullness, indexed by slot."""
+        return self._data[:self._count, 2]
+
+    def add(self, position: Tuple[float, float] = (0, 0), fullness: float = 1.0) -> int:
+        """
+        Add a bar and return its slot.
+
+        :param Tuple[float, float] position: The initial position of the bar.
+        :param float fullness: The initial fullness of the bar.
+        """
+        return int(self.add_many(np.reshape(position, (2, 1)), fullness)[0])
+
+    def add_many(self, positions, fullness=1.0) -> np.ndarray:
+        """
+        Add one bar per position and return their slots. Freed slots are reused first.
+
+        :param positions: (2, N) array of the initial bar centers.
+        :param fullness: Value or (N,) array of initial fullness values.
+        """
+        count = np.shape(positions)[1]
+        reused = [self._free.pop() for _ in range(min(count, len(self._free)))]
+        new = count - len(reused)
+        while self._count + new > len(self._data):
+            self._grow()
+        slots = np.concatenate([np.array(reused, dtype=np.int64),
+                                np.arange(self._count, self._count + new)])
+        self._count += new
+
+        self._data[slots] = (0.0, 0.0, 0.0, 1.0)
+        self._mark_dirty(slots)
+        self.set_fullness(slots, fullness)
+        self.set_positions(slots, positions)
+        return slots
+
+    def remove(self, slots) -> None:
+        """
+        Hide one or many bars and free their slots for the next :meth:`add`.
+
+        :param slots: Slot or array of slots of the bars to remove.
+        """
+        slots = np.atleast_1d(np.asarray(slots, dtype=np.int64))
+        self._data[slots, 3] = 0.0
+        self._mark_dirty(slots)
+        self._free.extend(slots.tolist())
+
+    def set_positions(self, slots, positions) -> None:
+        """
+        Move one or many bars. Only bars whose position changed are marked dirty.
+
+        :param slots: Slot or array of slots.
+        :param positions: (x, y) or (2, N) array of the new bar centers.
+        """
+        slots = np.atleast_1d(np.asarray(slots, dtype=np.int64))
+        positions = np.reshape(np.asarray(positions, dtype="f4"), (2, -1))
+        changed = np.any(self._data[slots, :2] != positions.T, 1)
+        if np.any(changed):
+            self._data[slots[changed], :2] = positions.T[changed]
+            self._mark_dirty(slots[changed])
+
+    def set_fullness(self, slots, fullness) -> None:
+        """
+        Fill one or many bars. Only bars whose fullness changed are marked dirty.
+
+        :param slots: Slot or array of slots.
+        :param fullness: Value or (N,) array of values between 0.0 and 1.0.
+        """
+        slots = np.atleast_1d(np.asarray(slots, dtype=np.int64))
+        fullness = np.broadcast_to(np.asarray(fullness, dtype="f4"), slots.shape)
+
+        # Check if the new fullness is valid
+        if np.any((fullness < 0.0) | (fullness > 1.0)):
+            raise ValueError(
+                f"Got {fullness}, but fullness must be between 0.0 and 1.0."
+            )
+
+        changed = self._data[slots, 2] != fullness
+        if np.any(changed):
+            self._data[slots[changed], 2] = fullness[changed]
+            self._mark_dirty(slots[changed])
+
+    def draw(self) -> None:
+        """Write the dirty bars to the GPU and draw every bar."""
+        if self._count == 0:
+            return
+
+        ctx = arcade.get_window().ctx
+        if self._program is None:
+            self._create_gl_resources(ctx)
+
+        # Upload all changed bars with one buffer write
+        if self._buffer_rows < len(self._data):
+            self._create_buffer(ctx)
+        elif self._dirty_low < self._dirty_high:
+            self._buffer.write(self._data[self._dirty_low:self._dirty_high],
+                               offset=self._dirty_low * self._data.strides[0])
+        self._dirty_low, self._dirty_high = len(self._data), 0
+
+        ctx.enable(ctx.BLEND)
+        self._geometry.render(self._program, mode=ctx.TRIANGLE_STRIP, vertices=4, instances=self._count)
+
+    def _mark_dirty(self, slots: np.ndarray) -> None:
+        if slots.size == 0:
+            return
+        self._dirty_low = min(self._dirty_low, int(slots.min()))
+        self._dirty_high = max(self._dirty_high, int(slots.max()) + 1)
+
+    def _grow(self) -> None:
+        # Double the rows, starting from one row when the bars were made with no room
+        self._data = np.concatenate([self._data, np.zeros((max(1, len(self._data)), 4), dtype="f4")])
+
+    def _create_gl_resources(self, ctx) -> None:
+        self._program = ctx.program(vertex_shader=BAR_VERTEX_SHADER, fragment_shader=BAR_FRAGMENT_SHADER)
+        self._program["outer_size"] = (self._box_width + self._border_size, self._box_height + self._border_size)
+        self._program["box_size"] = (self._box_width, self._box_height)
+        self._program["left_offset"] = self._box_width // 2
+        self._program["full_color"] = self._full_color
+        self._program["background_color"] = self._background_color
+        self._quad = ctx.buffer(data=np.array([-0.5, -0.5, 0.5, -0.5, -0.5, 0.5, 0.5, 0.5], dtype="f4"))
+
+    def _create_buffer(self, ctx) -> None:
+        self._buffer = ctx.buffer(data=self._data, usage="dynamic")
+        self._buffer_rows = len(self._data)
+        self._geometry = ctx.geometry([
+            BufferDescription(self._quad, "2f", ["in_vert"]),
+            BufferDescription(self._buffer, "2f 1f 1f", ["in_center", "in_fullness", "in_visible"], instanced=True),
+        ])
+
+
+class IndicatorBar:
+    """
+    Represents a bar which can display information about a sprite.
+    The bar is one slot in a shared :class:`IndicatorBars`, which holds its state and draws it.
+
+    :param Player owner: The owner of this indicator bar.
+    :param IndicatorBars bars: The shared bars this bar is drawn with.
+    :param Tuple[float, float] position: The initial position of the bar.
+    """
+
+    def __init__(
+            self,
+            owner: arcade.Sprite,
+            bars: IndicatorBars,
+            position: Tuple[float, float] = (0, 0),
+    ) -> None:
+        # Store the reference to the owner and the shared bars
+        self.owner: arcade.Sprite = owner
+        self.bars: IndicatorBars = bars
+
+        # Set the fullness and position of the bar
+        self.slot: int = self.bars.add(position, 1.0)
+
+    def __repr__(self) -> str:
+        return f"<IndicatorBar (Owner={self.owner})>"
 
     @property
     def fullness(self) -> float:
         """Returns the fullness of the bar."""
-        return self._fullness
+        return float(self.bars.fullness[self.slot])
 
     @fullness.setter
     def fullness(self, new_fullness: float) -> None:
         """Sets the fullness of the bar."""
-        # Check if new_fullness if valid
-        if not (0.0 <= new_fullness <= 1.0):
-            raise ValueError(
-                f"Got {new_fullness}, but fullness must be between 0.0 and 1.0."
-            )
-
-        # Set the size of the bar
-        self._fullness = new_fullness
-        if new_fullness == 0.0:
-            # Set the full_box to not be visible since it is not full anymore
-            self.full_box.visible = False
-        else:
-            # Set the full_box to be visible incase it wasn't then update the bar
-            self.full_box.visible = True
-            self.full_box.width = self._box_width * new_fullness
-            self.full_box.left = self._center_x - (self._box_width // 2)
+        self.bars.set_fullness(self.slot, new_fullness)
 
     @property
     def position(self) -> Tuple[float, float]:
         """Returns the current position of the bar."""
-        return self._center_x, self._center_y
+        x, y = self.bars.positions[:, self.slot]
+        return float(x), float(y)
 
     @position.setter
     def position(self, new_position: Tuple[float, float]) -> None:
         """Sets the new position of the bar."""
-        # Check if the position has changed. If so, change the bar's position
-        if new_position != self.position:
-            self._center_x, self._center_y = new_position
-            self.background_box.position = new_position
-            self.full_box.position = new_position
+        self.bars.set_positions(self.slot, new_position)
+
+    def remove(self) -> None:
+        """Removes the bar from the shared bars."""
+        self.bars.remove(self.slot)
+
 
-            # Make sure full_box is to the left of the bar instead of the middle
-            self.full_box.left = self._center_x - (self._box_width // 2)
+def _normalized_color(color: arcade.Color) -> Tuple[float, ...]:
+    """Converts an RGB or RGBA color to floats between 0.0 and 1.0."""
+    color = tuple(color) + (255,) * (4 - len(color))
+    return tuple(channel / 255 for channel in color)
 
 
 class MyGame(arcade.Window):
     def __init__(self) -> None:
         super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
         self.bullet_list = arcade.SpriteList()
-        self.bar_list = arcade.SpriteList()
+        self.bar_list = IndicatorBars()
         self.player_sprite = Player(self.bar_list)
         self.enemy_sprite = arcade.Sprite(image_zombie_idle, SPRITE_SCALING_ENEMY)
         self.top_text: arcade.Text = arcade.Text(
@@ -0,0 +1,94 @@
+"""
+Heads-up display for the bullet games.
+
+arcade.draw_text lays its text out again every time the text changes, and it shares one
+cached label between every call with the same style, so two lines of text drawn that way
+are laid out again on every frame. The HUD instead keeps one pyglet label per element for
+the whole game, only changes its text when the value shown changes, and draws every element
+in one batch.
+
+Required libraries to run are: arcade and pyglet
+"""
+
+# IMPORT LIBRARIES
+import arcade
+import pyglet
+
+# SET TEXT DEFAULTS, THE SAME AS arcade.draw_text
+FONT_NAME = ("calibri", "arial")
+
+
+class HudText:
+    """
+    One line of text on the HUD showing a value.
+
+    :param label: The pyglet label, already in the HUD batch.
+    :param template: Format string the value is put into, like "Score: {}".
+    """
+
+    def __init__(self, label, template):
+        """
+        Initialize object.
+        """
+        self.label = label
+        self.template = template
+        self.value = None
+
+    def set(self, value):
+        """
+        Show a new value. Nothing is laid out again if the value did not change.
+
+        :param value: The value to show.
+        """
+        if value != self.value:
+            self.value = value
+            self.label.text = self.template.format(value)
+
+
+class Hud:
+    """
+    Text elements drawn over the game in one batch.
+    """
+
+    def __init__(self):
+        """
+        Initialize object.
+        """
+        self.batch = pyglet.graphics.Batch()
+        self.texts = {}
+
+    def add(self, name, template, x, y, color=arcade.color.WHITE, font_size=12, value="", **label_options):
+        """
+        Add a text element to the HUD.
+
+        :param name: Name to find the element by.
+        :param template: Format string the value is put into, like "Score: {}".
+        :param x: Left of the text on screen.
+        :param y: Baseline of the text on screen.
+        :param color: Color of the text.
+        :param font_size: Size of the text.
+        :param value: First value to show.
+        :param label_options: Any other pyglet.text.Label option, like anchor_x or bold.
+        :return: The HudText.
+        """
+        label = pyglet.text.Label(x=x, y=y, color=arcade.get_four_byte_color(color), font_size=font_size,
+                                  font_name=label_options.pop("font_name", FONT_NAME), batch=self.batch,
+                                  **label_options)
+        self.texts[name] = HudText(label, template)
+        self.texts[name].set(value)
+        return self.texts[name]
+
+    def __getitem__(self, name):
+        """
+        Returns the text element with a name.
+
+        :param name: The name it was added with.
+        """
+        return self.texts[name]
+
+    def draw(self):
+        """
+        Draw every element with the current projection, one draw for the whole HUD.
+        """
+        with arcade.get_window().ctx.pyglet_rendering():
+            self.batch.draw()
@@ -0,0 +1,216 @@
+"""
+Compiled kernels for the hot loops of the bullet games.
+
+The boid neighbor sums and offsets, the follow step and the wall push-back are written as plain loops
+and compiled with Numba when it is installed. The loops touch each pair once and need no
+(N, N) temporaries. Compiled code is cached on disk next to this file, so only the very first
+run pays for compiling. Without Numba, or with BULLET_KERNELS=numpy set, every kernel is
+its NumPy version instead, which gives the same results.
+
+Required libraries to run are: os and numpy, numba is optional
+"""
+
+# IMPORT LIBRARIES
+import os
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# PICK THE BACKEND, NUMBA WHEN IT IS THERE UNLESS NUMPY IS ASKED FOR
+NUMBA = njit is not None and os.environ.get("BULLET_KERNELS", "numba") != "numpy"
+BACKEND = "numba" if NUMBA else "numpy"
+
+
+def neighbor_sums_loops(positions, values, radius_squared, groups, world_size):
+    """
+    For every boid, count its neighbors within a radius, itself included, and sum their values.
+    Only boids of the same group are neighbors.
+
+    :param positions: (2, N) array of boid positions.
+    :param values: (2, N) array of values to sum, such as positions or velocities.
+    :param radius_squared: Squared neighbor radius.
+    :param groups: (N,) integer array of the group of every boid, such as its species. All zeros for one group.
+    :param world_size: (2,) array of the width and height of a wrap-around world, distances are measured
+        the short way around it. Zero for an axis that does not wrap.
+    :return: (counts, sums) with shapes (N,) and (2, N).
+    """
+    count = positions.shape[1]
+    counts = np.ones(count)
+    sums = values.copy()
+    for i in range(count):
+        for j in range(i + 1, count):
+            if groups[i] != groups[j]:
+                continue
+            dx = positions[0, j] - positions[0, i]
+            dy = positions[1, j] - positions[1, i]
+            if world_size[0] > 0:
+                dx -= world_size[0] * np.floor(dx / world_size[0] + 0.5)
+            if world_size[1] > 0:
+                dy -= world_size[1] * np.floor(dy / world_size[1] + 0.5)
+            if dx * dx + dy * dy <= radius_squared:
+                counts[i] += 1
+                counts[j] += 1
+                sums[0, i] += values[0, j]
+                sums[1, i] += values[1, j]
+                sums[0, j] += values[0, i]
+                sums[1, j] += values[1, i]
+    return counts, sums
+
+
+def neighbor_sums_numpy(positions, values, radius_squared, groups, world_size):
+    """
+    NumPy version of neighbor_sums_loops, comparing every pair of boids at once.
+    """
+    separations = nearest_offsets_numpy(positions[:, :, np.newaxis] - positions[:, np.newaxis, :], world_size)
+    close = ((np.sum(separations * separations, 0) <= radius_squared)
+             & (groups[:, np.newaxis] == groups[np.newaxis, :])).astype(float)
+    return close.sum(0), values @ close
+
+
+def neighbor_offsets_loops(positions, radius_squared, world_size):
+    """
+    For every boid, sum the offsets to its neighbors within a radius, each measured the short way
+    around a wrap-around world.
+
+    :param positions: (2, N) array of boid positions.
+    :param radius_squared: Squared neighbor radius.
+    :param world_size: (2,) array of the width and height of the world, zero for an axis that does not wrap.
+    :return: (2, N) array of the summed offsets.
+    """
+    count = positions.shape[1]
+    sums = np.zeros((2, count))
+    for i in range(count):
+        for j in range(i + 1, count):
+            dx = positions[0, j] - positions[0, i]
+            dy = positions[1, j] - positions[1, i]
+            if world_size[0] > 0:
+                dx -= world_size[0] * np.floor(dx / world_size[0] + 0.5)
+            if world_size[1] > 0:
+                dy -= world_size[1] * np.floor(dy / world_size[1] + 0.5)
+            if dx * dx + dy * dy <= radius_squared:
+                sums[0, i] += dx
+                sums[1, i] += dy
+                sums[0, j] -= dx
+                sums[1, j] -= dy
+    return sums
+
+
+def neighbor_offsets_numpy(positions, radius_squared, world_size):
+    """
+    NumPy version of neighbor_offsets_loops, comparing every pair of boids at once.
+    """
+    separations = nearest_offsets_numpy(positions[:, np.newaxis, :] - positions[:, :, np.newaxis], world_size)
+    close = np.sum(separations * separations, 0) <= radius_squared
+    return np.sum(separations * close, 2)
+
+
+def nearest_offsets_numpy(offsets, world_size):
+    """
+    Returns (2, N, N) offsets between boids, each the short way around the axes of world_size that wrap.
+    """
+    wraps = np.reshape(world_size > 0, (2, 1, 1))
+    size = np.reshape(np.where(world_size > 0, world_size, 1.0), (2, 1, 1))
+    return offsets - wraps * size * np.floor(offsets / size + 0.5)
+
+
+def follow_step_loops(positions, target_x, target_y, speed):
+    """
+    Move every bird up to a speed toward the target on each axis, without overshooting it.
+
+    :param positions: (2, N) array of bird positions, moved in place.
+    :param target_x: x of the point the birds walk toward.
+    :param target_y: y of the point the birds walk toward.
+    :param speed: Largest step on each axis.
+    :return: (2, N) array of the steps taken.
+    """
+    velocities = np.empty_like(positions)
+    for i in range(positions.shape[1]):
+        velocities[0, i] = min(max(target_x - positions[0, i], -speed), speed)
+        velocities[1, i] = min(max(target_y - positions[1, i], -speed), speed)
+        positions[0, i] += velocities[0, i]
+        positions[1, i] += velocities[1, i]
+    return velocities
+
+
+def follow_step_numpy(positions, target_x, target_y, speed):
+    """
+    NumPy version of follow_step_loops.
+    """
+    offsets = np.array([[target_x], [target_y]]) - positions
+    velocities = np.clip(offsets, -speed, speed)
+    positions += velocities
+    return velocities
+
+
+def wall_pushes_loops(positions, velocities, half_sizes, wall_centers, wall_half_sizes, push):
+    """
+    Find the birds touching a wall and push each one back out against the way it was moving,
+    using the first wall it touches.
+
+    :param positions: (2, N) array of bird centers.
+    :param velocities: (2, N) array of bird velocities.
+    :param half_sizes: (2, N) array of the half width and half height of every bird.
+    :param wall_centers: (2, W) array of wall centers.
+    :param wall_half_sizes: (2, W) array of wall half widths and half heights.
+    :param push: How far a bird is pushed back.
+    :return: (offsets, stopped): (2, N) array of how far to move each bird, and (2, N) boolean
+        array of the velocity components to zero.
+    """
+    count = positions.shape[1]
+    offsets = np.zeros((2, count))
+    stopped = np.zeros((2, count), dtype=np.bool_)
+    for i in range(count):
+        for w in range(wall_centers.shape[1]):
+            if (abs(positions[0, i] - wall_centers[0, w]) <= half_sizes[0, i] + wall_half_sizes[0, w]
+                    and abs(positions[1, i] - wall_centers[1, w]) <= half_sizes[1, i] + wall_half_sizes[1, w]):
+                if velocities[1, i] < 0 and positions[1, i] > wall_centers[1, w]:  # trying to move down
+                    offsets[1, i] = push
+                    stopped[1, i] = True
+                elif velocities[1, i] > 0 and positions[1, i] < wall_centers[1, w]:  # trying to move up
+                    offsets[1, i] = -push
+                    stopped[1, i] = True
+                elif velocities[0, i] < 0 and positions[0, i] > wall_centers[0, w]:  # trying to move left
+                    offsets[0, i] = push
+                    stopped[0, i] = True
+                elif velocities[0, i] > 0 and positions[0, i] < wall_centers[0, w]:  # trying to move right
+                    offsets[0, i] = -push
+                    stopped[0, i] = True
+                break
+    return offsets, stopped
+
+
+def wall_pushes_numpy(positions, velocities, half_sizes, wall_centers, wall_half_sizes, push):
+    """
+    NumPy version of wall_pushes_loops, testing every bird against every wall at once.
+    """
+    count = positions.shape[1]
+    reach = half_sizes[:, :, np.newaxis] + wall_half_sizes[:, np.newaxis, :]
+    touching = np.all(np.abs(positions[:, :, np.newaxis] - wall_centers[:, np.newaxis, :]) <= reach, 0)
+    hit = touching.any(1) if wall_centers.shape[1] > 0 else np.zeros(count, dtype=bool)
+    walls = wall_centers[:, touching.argmax(1)] if wall_centers.shape[1] > 0 else np.zeros((2, count))
+
+    # THE SAME ORDER OF CHECKS AS THE LOOPS: DOWN, UP, LEFT, THEN RIGHT
+    down = hit & (velocities[1] < 0) & (positions[1] > walls[1])
+    up = hit & ~down & (velocities[1] > 0) & (positions[1] < walls[1])
+    left = hit & ~down & ~up & (velocities[0] < 0) & (positions[0] > walls[0])
+    right = hit & ~down & ~up & ~left & (velocities[0] > 0) & (positions[0] < walls[0])
+
+    offsets = np.array([(left * 1.0 - right) * push, (down * 1.0 - up) * push])
+    stopped = np.array([left | right, down | up])
+    return offsets, stopped
+
+
+# THE KERNELS THE GAMES CALL
+if NUMBA:
+    neighbor_sums = njit(cache=True)(neighbor_sums_loops)
+    neighbor_offsets = njit(cache=True)(neighbor_offsets_loops)
+    follow_step = njit(cache=True)(follow_step_loops)
+    wall_pushes = njit(cache=True)(wall_pushes_loops)
+else:
+    neighbor_sums = neighbor_sums_numpy
+    neighbor_offsets = neighbor_offsets_numpy
+    follow_step = follow_step_numpy
+    wall_pushes = wall_pushes_numpy
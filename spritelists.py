@@ -0,0 +1,187 @@
+"""
+Batched operations on arcade sprite lists for the bullet games.
+
+Sprites whose positions are simulated in (2, N) arrays get them written straight into the
+sprite list's position buffer with write_sprite_data, one array copy per frame instead of
+setting center_x and center_y on every sprite. The sprites' own attributes are then stale until
+sync_sprite_attributes copies the buffers back into them, which only code that reads them, such as
+arcade's collision functions, has to call first.
+
+arcade's SpriteList.remove searches its list and its index buffer for the sprite and shifts
+everything after it down, so removing k sprites one at a time costs O(k * n). Here the sprites
+are removed by position with the same swap-remove as the entity arrays (see ecs.swap_remove):
+the last sprites move into the holes, in the list and in the index buffer, so the sprite list
+stays in the same order as the arrays it draws and the cost only depends on k.
+
+write_sprite_textures does the same for the textures of the sprites that changed animation frame:
+one array copy into the texture buffer, where setting sprite.texture would be one call per sprite.
+
+draw_sprites draws only some of the sprites of a list, such as the ones the camera can see,
+by handing the GPU a shorter index buffer for that one draw.
+
+These functions work on the internals of arcade 2.6's SpriteList.
+Required libraries to run are: numpy
+Requires ecs.py
+"""
+
+# IMPORT LIBRARIES
+import numpy as np
+from ecs import swap_remove
+
+
+def swap_remove_sprites(sprite_list, rows):
+    """
+    Remove sprites by their position in a sprite list, moving the last sprites into the holes.
+
+    :param arcade.SpriteList sprite_list: The sprite list, drawn in the order it was filled.
+    :param rows: Array of positions of the sprites to remove, repeats allowed. Each must be in the list.
+    :return: The removed sprites.
+    """
+    count = len(sprite_list.sprite_list)
+    rows = np.unique(np.atleast_1d(np.asarray(rows, dtype=np.int64)))
+    if len(rows) > 0 and (rows[0] < 0 or rows[-1] >= count):
+        raise ValueError(f"Got rows from {rows[0]} to {rows[-1]}, but the sprite list has {count} sprites.")
+    movers, holes, end = swap_remove(count, rows)
+    sprites = sprite_list.sprite_list
+    removed = [sprites[row] for row in rows.tolist()]
+
+    # FORGET THE REMOVED SPRITES AND FREE THEIR BUFFER SLOTS
+    for sprite in removed:
+        slot = sprite_list.sprite_slot.pop(sprite)
+        sprite_list._sprite_buffer_free_slots.append(slot)
+        sprite.sprite_lists.remove(sprite_list)
+        if sprite_list.spatial_hash:
+            sprite_list.spatial_hash.remove_object(sprite)
+
+    # MOVE THE LAST SPRITES INTO THE HOLES, IN THE LIST AND IN THE INDEX BUFFER
+    for mover, hole in zip(movers.tolist(), holes.tolist()):
+        sprites[hole] = sprites[mover]
+    del sprites[end:]
+    index_data = np.frombuffer(sprite_list._sprite_index_data, dtype=np.int32)
+    index_data[holes] = index_data[movers]
+    index_data[end:count] = 0
+    sprite_list._sprite_index_slots = end
+    sprite_list._sprite_index_changed = True
+    return removed
+
+
+def draw_sprites(sprite_list, rows):
+    """
+    Draw only some sprites of a sprite list, in list order. Only the buffer slots of those sprites
+    are sent to the GPU, the full index buffer is sent again on the next whole draw.
+
+    :param arcade.SpriteList sprite_list: The sprite list.
+    :param rows: Sorted array of positions of the sprites to draw.
+    """
+    count = len(sprite_list.sprite_list)
+    if len(rows) == count:
+        sprite_list.draw()
+        return
+    if len(rows) == 0:
+        return
+
+    sprite_list.initialize()
+    sprite_list._write_sprite_buffers_to_gpu()
+    slots = np.frombuffer(sprite_list._sprite_index_data, dtype=np.int32)[:count][rows]
+    sprite_list._sprite_index_buf.write(np.ascontiguousarray(slots, dtype=np.int32).tobytes())
+    all_slots = sprite_list._sprite_index_slots
+    sprite_list._sprite_index_slots = len(rows)
+    try:
+        sprite_list.draw()
+    finally:
+        sprite_list._sprite_index_slots = all_slots
+        sprite_list._sprite_index_changed = True
+
+
+def write_sprite_textures(sprite_list, rows, textures, indices, previous=None):
+    """
+    Write the textures of some sprites straight into the list's texture buffer, one array copy
+    instead of one texture setter call per sprite.
+
+    Like write_sprite_data it leaves the sprites' own texture, width and height as they were, so
+    the caller has to know what every sprite shows, as animation.AnimationStates does. The list must
+    have been made after the window.
+
+    :param arcade.SpriteList sprite_list: The sprite list.
+    :param rows: Array of positions of the sprites to change.
+    :param textures: List of every texture the sprites can show.
+    :param indices: Array of the index into textures of the new texture of every sprite.
+    :param previous: Array of the index into textures of the texture every sprite showed, to scale
+        its size by how much bigger the new texture is, or None when the textures are all the same size.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return
+    sprite_list.initialize()
+    slots = np.frombuffer(sprite_list._sprite_index_data, dtype=np.int32)[rows]
+
+    # ATLAS SLOT OF EVERY TEXTURE, ADDING THE ONES NOT IN THE ATLAS YET
+    atlas_slots = np.array([sprite_list._atlas.add(texture)[0] for texture in textures], dtype=np.float32)
+    np.frombuffer(sprite_list._sprite_texture_data, dtype=np.float32)[slots] = atlas_slots[indices]
+    sprite_list._sprite_texture_changed = True
+
+    if previous is not None:
+        texture_sizes = np.array([(texture.width, texture.height) for texture in textures], dtype=np.float32)
+        ratios = texture_sizes[indices] / texture_sizes[previous]
+        if np.any(ratios != 1):
+            np.frombuffer(sprite_list._sprite_size_data, dtype=np.float32).reshape(-1, 2)[slots] *= ratios
+            sprite_list._sprite_size_changed = True
+
+
+def write_sprite_data(sprite_list, positions, angles=None, sizes=None):
+    """
+    Write the positions, and optionally the angles and sizes, of every sprite in a sprite list
+    straight into the list's buffers, one array copy each instead of one setter call per sprite.
+
+    The sprites' own center_x, center_y, angle, width and height are left as they were: the arrays
+    the positions came from are where they live, see sync_sprite_attributes. A spatial hash would
+    go stale the same way, so lists with one are refused. The list must have been made after the window.
+
+    :param arcade.SpriteList sprite_list: The sprite list, in the same order as the arrays.
+    :param positions: (2, N) array of sprite centers.
+    :param angles: (N,) array of sprite angles in degrees, or None to leave them.
+    :param sizes: (2, N) array of sprite widths and heights, or None to leave them.
+    """
+    if sprite_list.spatial_hash:
+        raise ValueError("Got a sprite list with a spatial hash, but writing its buffers would leave the hash stale.")
+    count = len(sprite_list.sprite_list)
+    slots = np.frombuffer(sprite_list._sprite_index_data, dtype=np.int32)[:count]
+
+    # BUFFER SLOTS ARE GIVEN OUT IN ORDER, SO UNTIL SPRITES ARE REMOVED THE COPY IS ONE CONTIGUOUS BLOCK
+    if np.array_equal(slots, np.arange(count)):
+        slots = slice(0, count)
+
+    np.frombuffer(sprite_list._sprite_pos_data, dtype=np.float32).reshape(-1, 2)[slots] = np.transpose(positions)
+    sprite_list._sprite_pos_changed = True
+    if angles is not None:
+        np.frombuffer(sprite_list._sprite_angle_data, dtype=np.float32)[slots] = angles
+        sprite_list._sprite_angle_changed = True
+    if sizes is not None:
+        np.frombuffer(sprite_list._sprite_size_data, dtype=np.float32).reshape(-1, 2)[slots] = np.transpose(sizes)
+        sprite_list._sprite_size_changed = True
+
+
+def sync_sprite_attributes(sprite_list, rows=None):
+    """
+    Copy the positions, angles and sizes in a sprite list's buffers back into its sprites, after
+    write_sprite_data left them stale. Call it before handing the sprites to code that reads them.
+
+    :param arcade.SpriteList sprite_list: The sprite list.
+    :param rows: Array of positions of the sprites to update, or None for all of them.
+    """
+    sprites = sprite_list.sprite_list
+    rows = np.arange(len(sprites)) if rows is None else np.asarray(rows, dtype=np.int64)
+    slots = np.frombuffer(sprite_list._sprite_index_data, dtype=np.int32)[rows]
+    positions = np.frombuffer(sprite_list._sprite_pos_data, dtype=np.float32).reshape(-1, 2)[slots].tolist()
+    angles = np.frombuffer(sprite_list._sprite_angle_data, dtype=np.float32)[slots].tolist()
+    sizes = np.frombuffer(sprite_list._sprite_size_data, dtype=np.float32).reshape(-1, 2)[slots].tolist()
+
+    # SET THE FIELDS BEHIND THE POSITION AND ANGLE SETTERS, WHICH WOULD WRITE THE SAME VALUES BACK INTO
+    # THE BUFFERS. SIZES GO THROUGH THE SETTERS, WHICH ALSO SCALE THE HIT BOX
+    for row, position, angle, (width, height) in zip(rows.tolist(), positions, angles, sizes):
+        sprite = sprites[row]
+        sprite._position = tuple(position)
+        sprite._angle = angle
+        sprite._point_list_cache = None
+        sprite.width = width
+        sprite.height = height
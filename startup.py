@@ -0,0 +1,108 @@
+"""
+Startup pipeline for the bullet games.
+
+The window opens first and the rest of the game is loaded in stages, one stage per frame,
+with a loading screen drawn in between. A StartupTimer records how long the imports, every
+stage and the first frames took, for the --measure-startup mode of the games.
+
+Import this module before anything else so the import time of the rest of the game is counted.
+Required libraries to run are: time and contextlib
+"""
+
+# IMPORT LIBRARIES
+import time
+from contextlib import contextmanager
+
+# RECORDED AS SOON AS THIS MODULE IS IMPORTED
+IMPORT_STARTED = time.perf_counter()
+
+# SET STARTUP BUDGET (seconds from the first import to the first game frame)
+STARTUP_BUDGET = 1.0
+
+
+class StartupTimer:
+    """
+    Records how long each part of startup took, and how long after the first import
+    events such as the first frame happened.
+    """
+
+    def __init__(self):
+        """
+        Initialize object.
+        """
+        self.times = {}
+
+    @contextmanager
+    def measure(self, name):
+        """
+        Time the body of a ``with`` block, adding to any earlier time with the same name.
+
+        :param name: Name of the part of startup.
+        """
+        start = time.perf_counter()
+        yield
+        self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - start
+
+    def mark(self, name):
+        """
+        Record how long after the first import something happened. Only the first mark of a name counts.
+
+        :param name: Name of the event, such as "first frame".
+        """
+        self.times.setdefault(name, time.perf_counter() - IMPORT_STARTED)
+
+    def report(self):
+        """
+        Returns the recorded times as printable lines, in the order they were recorded,
+        checked against STARTUP_BUDGET.
+        """
+        lines = ["Startup times:"]
+        for name, seconds in self.times.items():
+            lines.append(f"  {name:<28} {seconds * 1000:8.1f} ms")
+
+        total = self.times.get("first game frame")
+        if total is not None:
+            verdict = "within" if total <= STARTUP_BUDGET else "over"
+            lines.append(f"  {verdict} the {STARTUP_BUDGET * 1000:.0f} ms startup budget")
+        return "\n".join(lines)
+
+
+class StartupPipeline:
+    """
+    Runs setup stages one at a time, so the window can draw between them.
+
+    :param stages: List of (name, function) setup stages, in order.
+    :param StartupTimer timer: Records how long every stage took.
+    """
+
+    def __init__(self, stages, timer):
+        """
+        Initialize object.
+        """
+        self.stages = list(stages)
+        self.timer = timer
+        self.index = 0
+
+    @property
+    def done(self):
+        """Returns whether every stage has run."""
+        return self.index >= len(self.stages)
+
+    @property
+    def current_name(self):
+        """Returns the name of the next stage to run."""
+        return self.stages[self.index][0] if not self.done else "done"
+
+    @property
+    def progress(self):
+        """Returns the fraction of stages that have run."""
+        return self.index / max(len(self.stages), 1)
+
+    def run_next(self):
+        """
+        Run the next stage.
+        """
+        name, stage = self.stages[self.index]
+        with self.timer.measure(name):
+            stage()
+        self.index += 1
@@ -0,0 +1,264 @@
+"""
+Vectorized boids game for agent training and parameter studies.
+
+Steps K independent copies of the boids game in lockstep, with the state of every copy in
+batched arrays: birds and bullets are (K, 2, N) arrays, the (2, N) layout of the games with
+the copy in front, and the player is a (K, 2) array. One action per copy is taken each step,
+and the rewards and done flags come back for all copies at once. A copy that is done starts
+over by itself, so the batch can be stepped forever.
+
+Birds fly with the boids rules of flock.py, comparing every pair of birds in a copy. Birds never
+meet birds or bullets of another copy. Nothing is drawn, so no window is needed.
+Every bird is of the one default species (see flock.DEFAULT_SPECIES), as in the boids game unless
+its MIXED_SPECIES is turned on; the hawks of the mixed game are not modeled here.
+
+Actions, one integer per copy:
+    0       do nothing
+    1 to 4  move one step with MOVEMENT_KEYS, in that order
+    5 to 8  shoot with BULLET_SHOOTING_KEYS, in that order
+
+Required libraries to run are: pathlib, arcade, numpy and PIL
+Requires bullet_game_boids.py, collision.py, flock.py and game_core.py
+"""
+
+# IMPORT LIBRARIES
+from pathlib import Path
+import arcade
+import numpy as np
+from PIL import Image
+from arcade.resources import resolve_resource_path
+from bullet_game_boids import BIRD_COUNT, BIRD_DAMAGE
+from collision import segment_box_hits
+from flock import (ALERT_DISTANCE, FORMATION_FLYING_DISTANCE, FORMATION_FLYING_STRENGTH, MOVE_TO_MIDDLE_STRENGTH,
+                   player_attraction)
+from game_core import (BIRD_HEALTH, BIRD_IMAGE, BULLET_DAMAGE, BULLET_IMAGE, BULLET_SHOOTING_KEYS, BULLET_SPEED,
+                       MOVEMENT_KEYS, PLAYER_HEALTH, PLAYER_IDLE_IMAGES, PLAYER_SPEED, SCREEN_HEIGHT, SCREEN_WIDTH,
+                       SPRITE_SCALING_BIRD, SPRITE_SCALING_LASER, SPRITE_SCALING_PLAYER, START_X, START_Y)
+
+# SET ACTIONS
+ACTION_KEYS = [None] + MOVEMENT_KEYS + BULLET_SHOOTING_KEYS
+KEY_MOVES = {arcade.key.LEFT: (-1, 0), arcade.key.RIGHT: (1, 0), arcade.key.UP: (0, 1), arcade.key.DOWN: (0, -1)}
+KEY_SHOTS = {arcade.key.A: (-1, 0), arcade.key.D: (1, 0), arcade.key.W: (0, 1), arcade.key.S: (0, -1)}
+
+
+def image_half_size(file_name, scale):
+    """
+    Returns the (half width, half height) of an image drawn at a scale, the way the game sizes its sprites.
+    Only the image header is read.
+
+    :param file_name: Path of the image, ":resources:" paths included, others next to this file.
+    :param scale: Scale the image is drawn at.
+    """
+    if not str(file_name).startswith(":resources:"):
+        file_name = Path(__file__).parent / file_name
+    with Image.open(resolve_resource_path(file_name)) as image:
+        return image.width * scale / 2, image.height * scale / 2
+
+
+# SIZES THE GAME'S SPRITES ARE DRAWN AT. BIRD FRAMES ARE STORED AT WHOLE PIXELS, SEE animation.decode_strip
+BIRD_HALF_SIZE = tuple(round(half * 2) / 2 for half in image_half_size(BIRD_IMAGE, SPRITE_SCALING_BIRD))
+PLAYER_HALF_SIZE = image_half_size(PLAYER_IDLE_IMAGES[0], SPRITE_SCALING_PLAYER)
+BULLET_HALF_LENGTH, BULLET_HALF_THICKNESS = image_half_size(BULLET_IMAGE, SPRITE_SCALING_LASER)
+
+# SET BULLET ROOM, SHOTS ARE DROPPED WHILE A COPY HAS THIS MANY BULLETS FLYING
+BULLET_CAPACITY = 32
+
+# COPIES ARE LAID SIDE BY SIDE THIS FAR APART FOR THE BULLET TEST, SO THEY NEVER TOUCH
+COPY_SPACING = 4 * (SCREEN_WIDTH + SCREEN_HEIGHT)
+
+
+def action_table():
+    """
+    Returns the (moves, shots) of every action as (A, 2) arrays of directions, zero where the
+    action does not move or shoot.
+    """
+    moves = np.array([KEY_MOVES.get(key, (0, 0)) for key in ACTION_KEYS], dtype=float)
+    shots = np.array([KEY_SHOTS.get(key, (0, 0)) for key in ACTION_KEYS], dtype=float)
+    return moves, shots
+
+
+class BoidsVecEnv:
+    """
+    K copies of the boids game stepped together.
+
+    :param num_envs: How many copies to run.
+    :param bird_count: How many birds every copy starts with.
+    :param bird_damage: Health change for the player for each bird touching them, every step.
+    :param seed: Seed of the random starting velocities.
+    """
+
+    def __init__(self, num_envs, bird_count=BIRD_COUNT, bird_damage=BIRD_DAMAGE, seed=None):
+        """
+        Initialize object.
+        """
+        self.num_envs = num_envs
+        self.bird_count = bird_count
+        self.bird_damage = bird_damage
+        self.rng = np.random.default_rng(seed)
+        self.moves, self.shots = action_table()
+
+        # BIRDS, BULLETS AND PLAYERS OF EVERY COPY
+        self.bird_positions = np.zeros((num_envs, 2, bird_count))
+        self.bird_velocities = np.zeros((num_envs, 2, bird_count))
+        self.bird_health = np.zeros((num_envs, bird_count))
+        self.bird_alive = np.zeros((num_envs, bird_count), dtype=bool)
+        self.bullet_positions = np.zeros((num_envs, 2, BULLET_CAPACITY))
+        self.bullet_velocities = np.zeros((num_envs, 2, BULLET_CAPACITY))
+        self.bullet_alive = np.zeros((num_envs, BULLET_CAPACITY), dtype=bool)
+        self.player_positions = np.zeros((num_envs, 2))
+        self.player_health = np.zeros(num_envs)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        self.reset()
+
+    def reset(self, envs=None):
+        """
+        Start copies over, like BulletGame.setup does.
+
+        :param envs: Indices or boolean mask of the copies to start over, or None for all of them.
+        :return: The observations of every copy.
+        """
+        envs = np.arange(self.num_envs) if envs is None else np.atleast_1d(envs)
+        count = len(np.arange(self.num_envs)[envs])
+
+        # THE FLOCK STARTS IN THE MIDDLE OF THE SCREEN WITH SMALL RANDOM VELOCITIES, AS IN THE BOIDS GAME
+        self.bird_positions[envs] = np.reshape([SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2], (1, 2, 1))
+        self.bird_velocities[envs] = self.rng.random((count, 2, self.bird_count)) * .5
+        self.bird_health[envs] = BIRD_HEALTH
+        self.bird_alive[envs] = True
+        self.bullet_alive[envs] = False
+        self.player_positions[envs] = (START_X, START_Y)
+        self.player_health[envs] = PLAYER_HEALTH
+        self.score[envs] = 0
+        return self.observe()
+
+    def observe(self):
+        """
+        Returns a dictionary with a copy of the state of every copy of the game:
+        "player" (K, 2), "health" (K,), "birds" (K, 2, N), "bird_alive" (K, N),
+        "bullets" (K, 2, B) and "bullet_alive" (K, B).
+        """
+        return {
+            "player": self.player_positions.copy(),
+            "health": self.player_health.copy(),
+            "birds": self.bird_positions.copy(),
+            "bird_alive": self.bird_alive.copy(),
+            "bullets": self.bullet_positions.copy(),
+            "bullet_alive": self.bullet_alive.copy(),
+        }
+
+    def step(self, actions):
+        """
+        Move every copy forward one frame.
+
+        :param actions: (K,) array of actions, one per copy.
+        :return: (observations, rewards, dones, info). A reward is the score gained minus the health lost
+            that step, info holds both as "score" and "health_loss". Copies that are done have
+            already started over in the observations.
+        """
+        actions = np.asarray(actions)
+        score = self.score.copy()
+        health = self.player_health.copy()
+
+        self.step_birds()
+
+        # MOVE THE PLAYERS, KEEPING THEM ON SCREEN
+        self.player_positions += self.moves[actions] * PLAYER_SPEED
+        np.clip(self.player_positions, 0, (SCREEN_WIDTH, SCREEN_HEIGHT), out=self.player_positions)
+
+        # SHOOT FROM THE PLAYER INTO THE FIRST FREE BULLET SLOT
+        shooting = np.flatnonzero(np.any(self.shots[actions] != 0, 1) & ~self.bullet_alive.all(1))
+        slots = np.argmin(self.bullet_alive[shooting], 1)
+        self.bullet_positions[shooting, :, slots] = self.player_positions[shooting]
+        self.bullet_velocities[shooting, :, slots] = self.shots[actions[shooting]] * BULLET_SPEED
+        self.bullet_alive[shooting, slots] = True
+
+        # MOVE THE BULLETS AND HIT THE BIRDS THEY RAN INTO
+        starts = self.bullet_positions.copy()
+        self.bullet_positions += self.bullet_velocities * self.bullet_alive[:, np.newaxis, :]
+        self.shoot_birds(starts)
+
+        # REMOVE BULLETS OFF OF SCREEN AND BIRDS THAT LEFT IT
+        self.bullet_alive &= self.on_screen(self.bullet_positions, BULLET_HALF_LENGTH)
+        self.bird_alive &= self.on_screen(self.bird_positions, np.reshape(BIRD_HALF_SIZE, (1, 2, 1)))
+
+        # BIRDS TOUCHING THE PLAYER HURT IT
+        reach = np.reshape(np.add(BIRD_HALF_SIZE, PLAYER_HALF_SIZE), (1, 2, 1))
+        offsets = np.abs(self.bird_positions - self.player_positions[:, :, np.newaxis])
+        hits = np.count_nonzero(np.all(offsets <= reach, 1) & self.bird_alive, 1)
+        self.player_health = np.maximum(self.player_health + self.bird_damage * hits, 0)
+
+        # REWARDS, THEN START FINISHED COPIES OVER
+        score_gained = self.score - score
+        health_loss = health - self.player_health
+        dones = (self.player_health <= 0) | ~self.bird_alive.any(1)
+        if dones.any():
+            self.reset(dones)
+        info = {"score": score_gained, "health_loss": health_loss}
+        return self.observe(), score_gained - health_loss, dones, info
+
+    def step_birds(self):
+        """
+        Move every flock one step with the boids rules of flock.Flock, counting only live birds.
+        """
+        alive = self.bird_alive[:, np.newaxis, :]
+        count = np.maximum(self.bird_alive.sum(1), 1)[:, np.newaxis, np.newaxis]
+
+        # ATTRACTION TOWARD THE PLAYER, COHESION TOWARD THE MIDDLE OF THE LIVE BIRDS
+        self.bird_velocities += player_attraction(self.bird_positions - self.player_positions[:, :, np.newaxis], (0, 0))
+        centroid = (self.bird_positions * alive).sum(2, keepdims=True) / count
+        self.bird_velocities -= (self.bird_positions - centroid) * MOVE_TO_MIDDLE_STRENGTH
+
+        # PAIRS OF LIVE BIRDS IN THE SAME COPY AND THEIR SQUARED DISTANCES
+        separations = self.bird_positions[:, :, :, np.newaxis] - self.bird_positions[:, :, np.newaxis, :]
+        square_distances = np.sum(separations * separations, 1)
+        pairs = self.bird_alive[:, :, np.newaxis] & self.bird_alive[:, np.newaxis, :]
+
+        # SEPARATION FROM BIRDS THAT ARE TOO CLOSE
+        close = ((square_distances <= ALERT_DISTANCE) & pairs).astype(float)
+        self.bird_velocities += self.bird_positions * close.sum(1)[:, np.newaxis, :] - self.bird_positions @ close
+
+        # ALIGNMENT WITH BIRDS FLYING IN FORMATION
+        close = ((square_distances <= FORMATION_FLYING_DISTANCE) & pairs).astype(float)
+        spread = self.bird_velocities * close.sum(1)[:, np.newaxis, :] - self.bird_velocities @ close
+        self.bird_velocities -= spread / count * FORMATION_FLYING_STRENGTH
+
+        self.bird_positions += self.bird_velocities * alive
+
+    def shoot_birds(self, starts):
+        """
+        Find the first bird each bullet ran into this step in its own copy, remove those bullets,
+        damage those birds and score the birds that died.
+
+        :param starts: (K, 2, B) array of where the bullets were before they moved.
+        """
+        bullet_envs, bullets = np.nonzero(self.bullet_alive)
+        bird_envs, birds = np.nonzero(self.bird_alive)
+        if len(bullets) == 0 or len(birds) == 0:
+            return
+
+        # LAY THE COPIES SIDE BY SIDE SO ONE SWEPT TEST COVERS THEM ALL
+        shift = np.array([[COPY_SPACING], [0]])
+        reach = self.bullet_velocities[bullet_envs, :, bullets].T / BULLET_SPEED * BULLET_HALF_LENGTH
+        hit_bullets, hit_birds, _ = segment_box_hits(starts[bullet_envs, :, bullets].T + shift * bullet_envs - reach,
+                                                      self.bullet_positions[bullet_envs, :, bullets].T
+                                                      + shift * bullet_envs + reach,
+                                                      self.bird_positions[bird_envs, :, birds].T + shift * bird_envs,
+                                                      BIRD_HALF_SIZE, radius=BULLET_HALF_THICKNESS)
+
+        self.bullet_alive[bullet_envs[hit_bullets], bullets[hit_bullets]] = False
+        np.subtract.at(self.bird_health, (bird_envs[hit_birds], birds[hit_birds]), BULLET_DAMAGE)
+        dead = self.bird_alive & (self.bird_health <= 0)
+        self.score += dead.sum(1)
+        self.bird_alive &= ~dead
+
+    @staticmethod
+    def on_screen(positions, half_sizes):
+        """
+        Returns the (K, N) mask of what touches the screen.
+
+        :param positions: (K, 2, N) array of centers.
+        :param half_sizes: Half sizes, broadcast against the positions.
+        """
+        low = positions + half_sizes >= 0
+        high = positions - half_sizes <= np.reshape([SCREEN_WIDTH, SCREEN_HEIGHT], (1, 2, 1))
+        return np.all(low & high, 1)
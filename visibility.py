@@ -0,0 +1,45 @@
+"""
+Camera culling for the bullet games.
+
+The visible part of the world is the camera viewport, given as (left, right, bottom, top)
+like arcade.get_viewport returns it. Moving entities kept in (2, N) position arrays are
+tested against it all at once. The map tiles are culled by chunk in world.py.
+
+Testing every entity is O(N) per frame, but it is one vectorized comparison. A spatial lookup
+would not do better here: every bird changes cells every frame, so keeping a grid of them up to
+date, or sorting them into cells to gather the ones in view, already costs at least as much.
+
+Required libraries to run are: numpy
+Requires collision.py
+"""
+
+# IMPORT LIBRARIES
+import numpy as np
+from collision import box_contacts
+
+
+def view_box(viewport, margin=0):
+    """
+    Returns the (center, half size) of a viewport, grown by a margin on every side.
+
+    :param viewport: The (left, right, bottom, top) of the view.
+    :param margin: How far outside the view still counts as visible.
+    """
+    left, right, bottom, top = viewport
+    center = ((left + right) / 2, (bottom + top) / 2)
+    half_size = ((right - left) / 2 + margin, (top - bottom) / 2 + margin)
+    return center, half_size
+
+
+def visible_indices(positions, half_sizes, viewport, margin=0):
+    """
+    Find which entities can be seen.
+
+    :param positions: (2, N) array of entity centers.
+    :param half_sizes: (2,) or (2, N) half width and half height of the entities.
+    :param viewport: The (left, right, bottom, top) of the view.
+    :param margin: How far outside the view still counts as visible.
+    :return: Sorted indices of the entities touching the view.
+    """
+    center, half_size = view_box(viewport, margin)
+    return np.flatnonzero(box_contacts(positions, half_sizes, center, half_size))
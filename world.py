@@ -0,0 +1,290 @@
+"""
+Streamed tile world for the bullet games.
+
+The tile layers of a map are kept as arrays of tile numbers, and tile sprites are only made
+for the square chunks of the map around the camera. Chunks next to the view are built ahead
+of time, one per frame, and chunks far behind it are thrown away, so memory and drawing
+cost depend on the size of the view, not the size of the map.
+
+The tile numbers come from a tile source: MapTiles holds a whole parsed .tmj map in memory,
+and chunkmap.ChunkedMap reads chunks of a converted map from disk as they are needed.
+With a bake.ChunkBaker every chunk is pre-rendered into one texture as soon as it is built.
+
+Required libraries to run are: math, arcade, numpy and pytiled_parser
+Requires assets.py
+"""
+
+# IMPORT LIBRARIES
+import math
+import arcade
+import numpy as np
+import pytiled_parser
+from assets import map_image_path
+
+# TILED KEEPS THE FLIPS OF A TILE IN THE TOP BITS OF ITS NUMBER
+FLIPPED_HORIZONTALLY = 0x80000000
+FLIPPED_VERTICALLY = 0x40000000
+FLIPPED_DIAGONALLY = 0x20000000
+TILE_NUMBER_MASK = 0x1FFFFFFF
+
+
+def tile_layers(layers):
+    """
+    Returns the tile layers of a parsed map in drawing order, with the layers inside groups in place of the group.
+
+    :param layers: The layers of a pytiled_parser.TiledMap.
+    """
+    found = []
+    for layer in layers:
+        if isinstance(layer, pytiled_parser.LayerGroup):
+            found += tile_layers(layer.layers)
+        elif isinstance(layer, pytiled_parser.TileLayer):
+            found.append(layer)
+    return found
+
+
+def tileset_table(tiled_map):
+    """
+    Returns the tilesets of a parsed map as plain dictionaries, sorted by first tile number,
+    with image files named the way arcade's TileMap asks for them.
+
+    :param pytiled_parser.TiledMap tiled_map: The parsed map.
+    """
+    table = []
+    for first_gid, tileset in sorted(tiled_map.tilesets.items()):
+        table.append({
+            "first_gid": first_gid,
+            "image": map_image_path(tiled_map, tileset.image) if tileset.image is not None else None,
+            "columns": tileset.columns,
+            "margin": tileset.margin,
+            "spacing": tileset.spacing,
+            "tile_width": tileset.tile_width,
+            "tile_height": tileset.tile_height,
+            "tile_images": {tile_id: map_image_path(tiled_map, tile.image)
+                            for tile_id, tile in (tileset.tiles or {}).items() if tile.image is not None},
+        })
+    return table
+
+
+class MapTiles:
+    """
+    Tile source holding every visible tile layer of a parsed map in memory.
+
+    :param pytiled_parser.TiledMap tiled_map: The parsed map.
+    :param chunk_tiles: Width and height of a chunk in tiles.
+    """
+
+    def __init__(self, tiled_map, chunk_tiles=16):
+        """
+        Initialize object.
+        """
+        self.chunk_tiles = chunk_tiles
+        self.columns = tiled_map.map_size.width
+        self.rows = tiled_map.map_size.height
+        self.tile_width = tiled_map.tile_size.width
+        self.tile_height = tiled_map.tile_size.height
+        self.tilesets = tileset_table(tiled_map)
+
+        # ONE (rows, columns) ARRAY OF TILE NUMBERS PER VISIBLE LAYER, ROW 0 AT THE BOTTOM OF THE WORLD
+        layers = [layer for layer in tile_layers(tiled_map.layers) if layer.visible]
+        self.layer_opacity = [layer.opacity if layer.opacity is not None else 1 for layer in layers]
+        self.tiles = np.stack([np.flipud(np.array(layer.data, dtype=np.uint32)) for layer in layers])
+
+    def chunk(self, key):
+        """
+        Returns the (layers, rows, columns) tile numbers of a chunk, row 0 at the bottom.
+
+        :param key: The (column, row) of the chunk.
+        """
+        column, row = key
+        return self.tiles[:, row * self.chunk_tiles:(row + 1) * self.chunk_tiles,
+                          column * self.chunk_tiles:(column + 1) * self.chunk_tiles]
+
+    def prefetch(self, keys):
+        """
+        Nothing to do, every chunk is already in memory.
+
+        :param keys: The (column, row) of chunks that will be needed soon.
+        """
+
+
+class TileWorld:
+    """
+    The tile layers of a map, turned into sprites one chunk at a time around the camera.
+
+    :param source: Tile source, MapTiles or chunkmap.ChunkedMap.
+    :param scaling: Scale of the tiles.
+    :param prefetch_chunks: How many chunks beyond the view are built ahead of time.
+    :param keep_chunks: How many chunks beyond the view are kept before being thrown away.
+    :param bake.ChunkBaker baker: Pre-renders each chunk into a texture, or None to draw the tile sprites.
+    """
+
+    def __init__(self, source, scaling=1, prefetch_chunks=1, keep_chunks=2, baker=None):
+        """
+        Initialize object.
+        """
+        self.source = source
+        self.scaling = scaling
+        self.prefetch_chunks = prefetch_chunks
+        self.keep_chunks = keep_chunks
+        self.baker = baker
+        self.chunk_tiles = source.chunk_tiles
+        self.tile_width = source.tile_width * scaling
+        self.tile_height = source.tile_height * scaling
+        self.columns = source.columns
+        self.rows = source.rows
+
+        # TILESETS BY FIRST TILE NUMBER, TEXTURES BY TILE NUMBER
+        self.first_gids = [tileset["first_gid"] for tileset in source.tilesets]
+        self.textures = {}
+
+        # chunks[(column, row)] IS ONE SPRITE LIST PER LAYER, OR A BakedChunk, FOR THE CHUNKS BUILT SO FAR
+        self.chunks = {}
+        self.last_center = None
+
+    @property
+    def width(self):
+        """Returns the width of the world in pixels."""
+        return self.columns * self.tile_width
+
+    @property
+    def height(self):
+        """Returns the height of the world in pixels."""
+        return self.rows * self.tile_height
+
+    def chunks_near(self, viewport, margin=0):
+        """
+        Returns the (column, row) of the chunks of the map under a viewport.
+
+        :param viewport: The (left, right, bottom, top) of the view.
+        :param margin: How many extra chunks to take on every side.
+        """
+        left, right, bottom, top = viewport
+        chunk_width = self.chunk_tiles * self.tile_width
+        chunk_height = self.chunk_tiles * self.tile_height
+        last_column = math.ceil(self.columns / self.chunk_tiles) - 1
+        last_row = math.ceil(self.rows / self.chunk_tiles) - 1
+
+        # TILES CAN BE TALLER OR WIDER THAN THE GRID, SO TAKE THE CHUNKS JUST BELOW AND LEFT OF THE VIEW TOO
+        first_column = max(math.floor(left / chunk_width) - margin - 1, 0)
+        first_row = max(math.floor(bottom / chunk_height) - margin - 1, 0)
+        end_column = min(math.floor(right / chunk_width) + margin, last_column)
+        end_row = min(math.floor(top / chunk_height) + margin, last_row)
+        return {(column, row)
+                for row in range(first_row, end_row + 1)
+                for column in range(first_column, end_column + 1)}
+
+    def update(self, viewport):
+        """
+        Build the chunks under the view that are missing, build one chunk next to the view ahead of time,
+        ask the source for the chunks the view is heading to, and throw away the chunks far from it.
+
+        :param viewport: The (left, right, bottom, top) of the view.
+        """
+        for key in self.chunks_near(viewport) - self.chunks.keys():
+            self.chunks[key] = self.build_chunk(key)
+
+        # SPREAD THE CHUNKS AROUND THE VIEW OVER SEVERAL FRAMES SO CROSSING INTO A NEW CHUNK DOES NOT STALL
+        upcoming = self.chunks_near(viewport, self.prefetch_chunks) - self.chunks.keys()
+        if upcoming:
+            key = min(upcoming, key=lambda chunk: self.chunk_distance(chunk, viewport))
+            self.chunks[key] = self.build_chunk(key)
+
+        # LET THE SOURCE READ THE CHUNKS IN THE DIRECTION OF TRAVEL BEFORE THEY ARE BUILT
+        left, right, bottom, top = viewport
+        center = ((left + right) / 2, (bottom + top) / 2)
+        if self.last_center is not None and center != self.last_center:
+            step_x = np.sign(center[0] - self.last_center[0]) * self.chunk_tiles * self.tile_width
+            step_y = np.sign(center[1] - self.last_center[1]) * self.chunk_tiles * self.tile_height
+            ahead = (left + step_x, right + step_x, bottom + step_y, top + step_y)
+            self.source.prefetch(self.chunks_near(ahead, self.prefetch_chunks) - self.chunks.keys())
+        self.last_center = center
+
+        keep = self.chunks_near(viewport, self.keep_chunks)
+        for key in [key for key in self.chunks if key not in keep]:
+            chunk = self.chunks.pop(key)
+            if self.baker is not None:
+                chunk.release()
+
+    def chunk_distance(self, key, viewport):
+        """
+        Returns how far the center of a chunk is from the center of a viewport, in chunks.
+
+        :param key: The (column, row) of the chunk.
+        :param viewport: The (left, right, bottom, top) of the view.
+        """
+        left, right, bottom, top = viewport
+        column = (left + right) / 2 / (self.chunk_tiles * self.tile_width) - 0.5
+        row = (bottom + top) / 2 / (self.chunk_tiles * self.tile_height) - 0.5
+        return math.hypot(key[0] - column, key[1] - row)
+
+    def build_chunk(self, key):
+        """
+        Make the sprites of one chunk, and bake them if there is a baker.
+
+        :param key: The (column, row) of the chunk.
+        :return: One sprite list per layer, or the BakedChunk.
+        """
+        column, row = key
+        sprite_lists = []
+        for opacity, chunk in zip(self.source.layer_opacity, self.source.chunk(key)):
+            sprite_list = arcade.SpriteList(use_spatial_hash=False)
+            for tile_row, tile_column in zip(*np.nonzero(chunk)):
+                sprite = arcade.Sprite(texture=self.texture(int(chunk[tile_row, tile_column])), scale=self.scaling)
+                sprite.center_x = (column * self.chunk_tiles + tile_column) * self.tile_width + sprite.width / 2
+                sprite.center_y = (row * self.chunk_tiles + tile_row) * self.tile_height + sprite.height / 2
+                if opacity < 1:
+                    sprite.alpha = int(opacity * 255)
+                sprite_list.append(sprite)
+            sprite_lists.append(sprite_list)
+
+        if self.baker is not None:
+            chunk_width = self.chunk_tiles * self.tile_width
+            chunk_height = self.chunk_tiles * self.tile_height
+            return self.baker.bake(sprite_lists, (column * chunk_width, (column + 1) * chunk_width,
+                                                  row * chunk_height, (row + 1) * chunk_height))
+        return sprite_lists
+
+    def texture(self, gid):
+        """
+        Returns the texture of a tile number, loading it the first time, the same way arcade's TileMap does.
+
+        :param gid: Tile number from a layer, flip bits included.
+        """
+        if gid not in self.textures:
+            number = gid & TILE_NUMBER_MASK
+            tileset = self.source.tilesets[np.searchsorted(self.first_gids, number, side="right") - 1]
+            tile_id = number - tileset["first_gid"]
+            flips = {"flipped_horizontally": bool(gid & FLIPPED_HORIZONTALLY),
+                     "flipped_vertically": bool(gid & FLIPPED_VERTICALLY),
+                     "flipped_diagonally": bool(gid & FLIPPED_DIAGONALLY)}
+
+            if tileset["image"] is not None:
+                # CUT THE TILE OUT OF THE TILESET IMAGE
+                tile_column, tile_row = tile_id % tileset["columns"], tile_id // tileset["columns"]
+                x = tileset["margin"] + tile_column * (tileset["tile_width"] + tileset["spacing"])
+                y = tileset["margin"] + tile_row * (tileset["tile_height"] + tileset["spacing"])
+                self.textures[gid] = arcade.load_texture(tileset["image"], x, y,
+                                                         tileset["tile_width"], tileset["tile_height"],
+                                                         hit_box_algorithm="None", **flips)
+            else:
+                # ONE IMAGE PER TILE
+                self.textures[gid] = arcade.load_texture(tileset["tile_images"][tile_id],
+                                                         hit_box_algorithm="None", **flips)
+        return self.textures[gid]
+
+    def draw(self, viewport):
+        """
+        Draw the chunks under the viewport, layer by layer, or one quad per chunk when baked.
+
+        :param viewport: The (left, right, bottom, top) of the view.
+        """
+        chunks = [self.chunks[key] for key in self.chunks_near(viewport) if key in self.chunks]
+        if self.baker is not None:
+            self.baker.draw(chunks)
+            return
+
+        for layer in range(len(self.source.layer_opacity)):
+            for sprite_lists in chunks:
+                if len(sprite_lists[layer]) > 0:
+                    sprite_lists[layer].draw()